@@ -1,75 +1,122 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
-from data_utils import infer_data_type, check_and_preprocess
+import numpy as np
+from lazy_imports import lazy_import
+from data_utils import columns_of_type, check_and_preprocess
+from pipeline import render_outputs
+from timeseries import build_pyramid
+from chart_data import SCATTER_ROW_THRESHOLD, density_figure, outlier_positions, stratified_sample
+
+px = lazy_import("plotly.express")
+go = lazy_import("plotly.graph_objects")
+
+def _float_values(frame, columns):
+    return frame[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _sample_note(shown, total):
+    return ('caption', f"Showing a stratified sample of {shown:,} of {total:,} rows; outliers are always included.")
+
+
+def compute_visualizations(df):
+    outputs = [('header', "4. Advanced Visualizations")]
+
+    numeric_columns = columns_of_type(df, 'numeric')
+    date_columns = columns_of_type(df, 'datetime')
 
-def create_advanced_visualizations(df):
-    st.header("4. Advanced Visualizations")
-    
-    numeric_columns = [col for col in df.columns if infer_data_type(df[col]) == 'numeric']
-    date_columns = [col for col in df.columns if infer_data_type(df[col]) == 'datetime']
-    
     # Scatter plots
-    st.subheader("Scatter Plots")
+    outputs.append(('subheader', "Scatter Plots"))
     if len(numeric_columns) >= 2:
         for i in range(min(5, len(numeric_columns) - 1)):  # Create up to 5 scatter plots
             x_column = numeric_columns[i]
             y_column = numeric_columns[i + 1]
             try:
                 scatter_df = check_and_preprocess(df, {x_column: 'numeric', y_column: 'numeric'})
-                fig = px.scatter(scatter_df, x=x_column, y=y_column, 
-                                 title=f"Scatter plot: {x_column} vs {y_column}",
-                                 hover_data=df.columns)
-                st.plotly_chart(fig)
+                title = f"Scatter plot: {x_column} vs {y_column}"
+                values = _float_values(scatter_df, [x_column, y_column])
+                # Points only carry their row position; full rows are looked up on selection
+                if len(values) > SCATTER_ROW_THRESHOLD:
+                    complete = np.isfinite(values).all(axis=1)
+                    fig = density_figure(values[complete, 0], values[complete, 1], x_column, y_column, title)
+                    positions = outlier_positions(values)
+                    fig.add_trace(go.Scattergl(x=values[positions, 0], y=values[positions, 1], customdata=positions,
+                                               mode='markers', name="outliers", marker=dict(size=5, color='red')))
+                    outputs.append(('points', (fig, df)))
+                    outputs.append(('caption', f"Density of {int(complete.sum()):,} rows; the {len(positions):,} most extreme outliers are drawn as points."))
+                else:
+                    fig = px.scatter(scatter_df, x=x_column, y=y_column, title=title)
+                    fig.update_traces(customdata=np.arange(len(scatter_df)))
+                    outputs.append(('points', (fig, df)))
             except ValueError as e:
-                st.warning(f"Could not create scatter plot for {x_column} vs {y_column}: {str(e)}")
+                outputs.append(('warning', f"Could not create scatter plot for {x_column} vs {y_column}: {str(e)}"))
     else:
-        st.warning("Not enough numeric columns for scatter plots.")
-    
+        outputs.append(('warning', "Not enough numeric columns for scatter plots."))
+
     # Time series analysis (if applicable)
     if len(date_columns) > 0 and len(numeric_columns) > 0:
-        st.subheader("Time Series Analysis")
+        outputs.append(('subheader', "Time Series Analysis"))
         date_column = date_columns[0]
         for value_column in numeric_columns[:3]:  # Create up to 3 time series plots
             try:
                 ts_df = check_and_preprocess(df, {date_column: 'datetime', value_column: 'numeric'})
-                ts_df = ts_df.set_index(date_column)
-                fig = px.line(ts_df, y=value_column, title=f"Time Series: {value_column} over time")
-                st.plotly_chart(fig)
+                # Pre-aggregated once here; the zoom window is served at render time
+                pyramid = build_pyramid(ts_df[date_column], ts_df[value_column])
+                outputs.append(('timeseries', (pyramid, value_column, f"Time Series: {value_column} over time")))
             except ValueError as e:
-                st.warning(f"Could not create time series plot for {value_column}: {str(e)}")
-    
+                outputs.append(('warning', f"Could not create time series plot for {value_column}: {str(e)}"))
+
     # Pair plot
-    st.subheader("Pair Plot")
+    outputs.append(('subheader', "Pair Plot"))
+    selected_columns = None
     if len(numeric_columns) > 1:
         selected_columns = numeric_columns[:4]  # Select up to 4 columns for the pair plot
         try:
             pair_df = check_and_preprocess(df, {col: 'numeric' for col in selected_columns})
-            fig = px.scatter_matrix(pair_df[selected_columns])
-            st.plotly_chart(fig)
+            positions = np.arange(len(pair_df))
+            if len(pair_df) > SCATTER_ROW_THRESHOLD:
+                positions = stratified_sample(_float_values(pair_df, selected_columns))
+            fig = px.scatter_matrix(pair_df[selected_columns].iloc[positions], title="Pair plot")
+            fig.update_traces(customdata=positions)
+            outputs.append(('points', (fig, df)))
+            if len(positions) < len(pair_df):
+                outputs.append(_sample_note(len(positions), len(pair_df)))
         except ValueError as e:
-            st.warning(f"Could not create pair plot: {str(e)}")
+            outputs.append(('warning', f"Could not create pair plot: {str(e)}"))
     else:
-        st.warning("Not enough numeric columns for pair plot.")
-    
+        outputs.append(('warning', "Not enough numeric columns for pair plot."))
+
     # 3D Scatter plot
-    st.subheader("3D Scatter Plot")
+    outputs.append(('subheader', "3D Scatter Plot"))
+    scatter_3d = None
     if len(numeric_columns) >= 3:
         x_column, y_column, z_column = numeric_columns[:3]
+        scatter_3d = f"{x_column} vs {y_column} vs {z_column}"
         try:
             scatter_3d_df = check_and_preprocess(df, {x_column: 'numeric', y_column: 'numeric', z_column: 'numeric'})
-            fig = px.scatter_3d(scatter_3d_df, x=x_column, y=y_column, z=z_column, 
+            positions = np.arange(len(scatter_3d_df))
+            if len(scatter_3d_df) > SCATTER_ROW_THRESHOLD:
+                positions = stratified_sample(_float_values(scatter_3d_df, [x_column, y_column, z_column]))
+            fig = px.scatter_3d(scatter_3d_df.iloc[positions], x=x_column, y=y_column, z=z_column,
                                 title=f"3D Scatter plot: {x_column} vs {y_column} vs {z_column}")
-            st.plotly_chart(fig)
+            fig.update_traces(customdata=positions)
+            outputs.append(('points', (fig, df)))
+            if len(positions) < len(scatter_3d_df):
+                outputs.append(_sample_note(len(positions), len(scatter_3d_df)))
         except ValueError as e:
-            st.warning(f"Could not create 3D scatter plot: {str(e)}")
+            outputs.append(('warning', f"Could not create 3D scatter plot: {str(e)}"))
     else:
-        st.warning("Not enough numeric columns for 3D scatter plot.")
-    
+        outputs.append(('warning', "Not enough numeric columns for 3D scatter plot."))
+
     return {
-        "scatter_plots": [f"{numeric_columns[i]} vs {numeric_columns[i+1]}" for i in range(min(5, len(numeric_columns) - 1))],
-        "time_series": [f"{col} over time" for col in numeric_columns[:3]] if len(date_columns) > 0 else None,
-        "pair_plot": ", ".join(selected_columns) if 'selected_columns' in locals() else None,
-        "3d_scatter": f"{x_column} vs {y_column} vs {z_column}" if 'z_column' in locals() else None
-    }
\ No newline at end of file
+        "outputs": outputs,
+        "results": {
+            "scatter_plots": [f"{numeric_columns[i]} vs {numeric_columns[i+1]}" for i in range(min(5, len(numeric_columns) - 1))],
+            "time_series": [f"{col} over time" for col in numeric_columns[:3]] if len(date_columns) > 0 else None,
+            "pair_plot": ", ".join(selected_columns) if selected_columns is not None else None,
+            "3d_scatter": scatter_3d
+        }
+    }
+
+def create_advanced_visualizations(df):
+    visualizations = compute_visualizations(df)
+    render_outputs(visualizations["outputs"])
+    return visualizations["results"]
\ No newline at end of file
@@ -0,0 +1,251 @@
+import os
+import io
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from data_loader import DatasetError, read_dataset, list_excel_sheets, column_overview
+from data_utils import optimize_dtypes, preprocess_column, profile_dataframe
+from data_preprocessing import handle_missing_data, handle_outliers, outlier_bounds, outlier_sketches
+from compute_backend import COMPUTE_BACKEND, OUT_OF_CORE_BACKENDS, is_out_of_core, in_memory_frame, numeric_columns as numeric_column_names
+from exploratory_analysis import compute_eda
+from advanced_visualizations import compute_visualizations
+from machine_learning import compute_machine_learning
+from export_options import DATA_FORMATS, compression_options, export_dataframe
+from profiling import start_run, profile_stage, profile_events
+
+# Headless entry point: runs the app's stages on every CSV/XLSX file of a
+# directory, one file per worker process, and writes one JSON report per file.
+#   python batch.py exports/ -o reports/ --missing median --export .parquet
+
+BATCH_WORKERS = int(os.environ.get("EDA_BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_EXTENSIONS = (".csv", ".xlsx")
+MISSING_STRATEGIES = {
+    "keep": "Keep missing data",
+    "remove": "Remove rows with missing data",
+    "mean": "Fill missing data with mean/mode",
+    "median": "Fill missing data with median",
+}
+OUTLIER_STRATEGIES = {"keep": "Keep outliers", "remove": "Remove outliers", "cap": "Cap outliers"}
+ANALYSIS_STAGES = {
+    "eda": compute_eda,
+    "visualizations": compute_visualizations,
+    "machine_learning": compute_machine_learning,
+}
+# Stages that need the rows in memory; out-of-core data is sampled for them
+IN_MEMORY_STAGES = ("visualizations", "machine_learning")
+# Output kinds worth keeping in a report; figures and tables stay in the app
+MESSAGE_KINDS = ('caption', 'info', 'warning', 'error')
+
+class LocalFile(io.FileIO):
+    # The parts of Streamlit's UploadedFile the loaders rely on
+    def __init__(self, path):
+        super().__init__(path, 'rb')
+        self.size = os.path.getsize(path)
+
+    def getvalue(self):
+        self.seek(0)
+        return self.read()
+
+def find_files(input_dir, recursive=False):
+    if recursive:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(input_dir) for name in names]
+    else:
+        paths = [os.path.join(input_dir, name) for name in os.listdir(input_dir)]
+    paths = [path for path in paths if path.lower().endswith(BATCH_EXTENSIONS) and os.path.isfile(path)]
+    # Largest first, so one big file does not start last and hold up the whole batch
+    return sorted(paths, key=os.path.getsize, reverse=True)
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return _jsonable(value.to_dict('records'))
+    if isinstance(value, (pd.Series, pd.Index)):
+        return _jsonable(value.to_dict() if isinstance(value, pd.Series) else value.tolist())
+    if isinstance(value, np.ndarray):
+        return _jsonable(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def _messages(outputs):
+    return [{"kind": kind, "text": str(value).strip()} for kind, value in outputs if kind in MESSAGE_KINDS]
+
+def clean_data(df, missing_strategy, outlier_strategy):
+    # Same steps as preprocess_data, with the choices made up front
+    null_mask = None if is_out_of_core(df) else df.isna()
+    missing_values = profile_dataframe(df)['null_count'] if null_mask is None else null_mask.sum()
+    report = {"missing_values": missing_values, "missing_strategy": missing_strategy, "outliers": {}}
+    df = handle_missing_data(df, missing_strategy, null_mask)
+    numeric_columns = numeric_column_names(df)
+    sketches = outlier_sketches(df, numeric_columns)
+    for column in numeric_columns:
+        lower_bound, upper_bound = outlier_bounds(df, column, sketches)
+        if is_out_of_core(df):
+            count = df.outside(column, lower_bound, upper_bound, limit=0)[0]
+        else:
+            count = int(((df[column] < lower_bound) | (df[column] > upper_bound)).sum())
+        if count:
+            report["outliers"][column] = {"lower_bound": lower_bound, "upper_bound": upper_bound, "count": count}
+            df = handle_outliers(df, column, outlier_strategy, (lower_bound, upper_bound))
+    report["outlier_strategy"] = outlier_strategy
+    return df, report
+
+def analyse_file(path, options):
+    run = start_run()
+    started = time.perf_counter()
+    report = {"file": path, "status": "ok"}
+
+    with profile_stage("load") as stage, LocalFile(path) as source:
+        sheets = list_excel_sheets(source) if options["all_sheets"] and not path.endswith('.csv') else None
+        df, warnings = read_dataset(source, sheets=sheets, backend=options.get("backend", COMPUTE_BACKEND))
+        stage.update(output=df)
+    report["rows_loaded"], report["columns"] = df.shape
+    report["warnings"] = warnings
+    report["backend"] = df.engine if is_out_of_core(df) else "pandas"
+
+    if not is_out_of_core(df):
+        with profile_stage("optimize_dtypes", df):
+            df, memory_report = optimize_dtypes(df)
+        report["memory"] = {"bytes_before": memory_report['bytes_before'].sum(), "bytes_after": memory_report['bytes_after'].sum()}
+        with profile_stage("preprocess_column", df):
+            df = df.apply(preprocess_column)
+    report["column_overview"] = column_overview(df)
+
+    with profile_stage("preprocess_data", df) as stage:
+        df, report["cleaning"] = clean_data(df, options["missing_strategy"], options["outlier_strategy"])
+        stage.update(output=df)
+    report["rows_analysed"] = len(df)
+
+    sample = None
+    for name in options["stages"]:
+        kwargs = {"cores": options["ml_cores"]} if name == "machine_learning" else {}
+        data = df
+        if name in IN_MEMORY_STAGES and is_out_of_core(df):
+            # Engine frames are summarised in place; these stages get a sample
+            if sample is None:
+                with profile_stage("in_memory", df) as stage:
+                    sample = in_memory_frame(df)
+                    stage.update(output=sample)
+                report["sample_rows"] = len(sample)
+            data = sample
+        with profile_stage(name, data):
+            computed = ANALYSIS_STAGES[name](data, **kwargs)
+        report[name] = {"results": computed["results"], "messages": _messages(computed["outputs"])}
+
+    if options["export_format"]:
+        with profile_stage("export", df):
+            export = export_dataframe(df, options["export_format"], options["compression"])
+            target = os.path.join(options["output_dir"], _report_stem(path, options["input_dir"]) + export["file_name"][len("data"):])
+            shutil.move(export["path"], target)
+            export["path"] = target
+        report["export"] = export
+
+    report["seconds"] = time.perf_counter() - started
+    report["profile"] = profile_events(run)
+    return report
+
+def _report_stem(path, input_dir):
+    return os.path.relpath(path, input_dir).replace(os.sep, "__")
+
+def process_file(path, options):
+    # Runs in a worker; every failure is turned into an error report
+    started = time.perf_counter()
+    try:
+        report = analyse_file(path, options)
+    except DatasetError as e:
+        report = {"file": path, "status": "skipped", "error": str(e)}
+    except Exception as e:
+        report = {"file": path, "status": "error", "error": str(e), "traceback": traceback.format_exc()}
+    report.setdefault("seconds", time.perf_counter() - started)
+    report_path = os.path.join(options["output_dir"], _report_stem(path, options["input_dir"]) + ".json")
+    with open(report_path, 'w', encoding='utf-8') as handle:
+        json.dump(_jsonable(report), handle, indent=2)
+    return {"file": path, "status": report["status"], "seconds": report["seconds"],
+            "rows": report.get("rows_loaded"), "report": report_path, "error": report.get("error")}
+
+def run_batch(input_dir, output_dir, workers=BATCH_WORKERS, recursive=False, on_done=None, **options):
+    paths = find_files(input_dir, recursive)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers, len(paths)))
+    options = dict(options, input_dir=input_dir, output_dir=output_dir)
+    # Cores left over after one process per file go to model training
+    options.setdefault("ml_cores", max(1, (os.cpu_count() or 1) // workers))
+    summaries = []
+
+    if workers == 1:
+        for path in paths:
+            summaries.append(process_file(path, options))
+            if on_done:
+                on_done(summaries[-1])
+        return summaries
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(process_file, path, options) for path in paths]
+        for future in as_completed(futures):
+            summaries.append(future.result())
+            if on_done:
+                on_done(summaries[-1])
+    return summaries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the EDA pipeline headless on a directory of CSV/XLSX files.")
+    parser.add_argument("input_dir")
+    parser.add_argument("-o", "--output-dir", default="eda_reports")
+    parser.add_argument("-w", "--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("--all-sheets", action="store_true", help="Load every sheet of a workbook instead of the first one.")
+    parser.add_argument("--backend", choices=("auto", "pandas") + OUT_OF_CORE_BACKENDS, default=COMPUTE_BACKEND,
+                        help="Engine for CSV files; auto queries files above EDA_OUT_OF_CORE_BYTES on disk.")
+    parser.add_argument("--missing", choices=MISSING_STRATEGIES, default="keep")
+    parser.add_argument("--outliers", choices=OUTLIER_STRATEGIES, default="keep")
+    parser.add_argument("--stages", default=",".join(ANALYSIS_STAGES),
+                        help=f"Comma-separated subset of: {', '.join(ANALYSIS_STAGES)}.")
+    parser.add_argument("--export", choices=list(DATA_FORMATS), help="Also write the cleaned data next to the report.")
+    parser.add_argument("--compression", default=None)
+    args = parser.parse_args(argv)
+
+    stages = [name for name in args.stages.split(",") if name]
+    unknown = [name for name in stages if name not in ANALYSIS_STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    compression = args.compression
+    if args.export:
+        compression = compression or compression_options(args.export)[0]
+        if compression not in compression_options(args.export):
+            parser.error(f"compression for {args.export} must be one of: {', '.join(compression_options(args.export))}")
+
+    started = time.perf_counter()
+    # One JSON line per finished file on stdout, so runs can be piped into other tools
+    summaries = run_batch(
+        args.input_dir, args.output_dir, args.workers, args.recursive,
+        on_done=lambda summary: print(json.dumps(_jsonable(summary)), flush=True),
+        all_sheets=args.all_sheets, backend=args.backend, missing_strategy=MISSING_STRATEGIES[args.missing],
+        outlier_strategy=OUTLIER_STRATEGIES[args.outliers], stages=stages,
+        export_format=args.export, compression=compression,
+    )
+    seconds = time.perf_counter() - started
+    failed = sum(summary["status"] == "error" for summary in summaries)
+    print(f"Processed {len(summaries)} file(s) in {seconds:.1f}s, {failed} failed; reports in {args.output_dir}",
+          file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
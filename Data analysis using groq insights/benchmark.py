@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from data_utils import infer_data_type
+from data_preprocessing import handle_missing_data
+from exploratory_analysis import compute_eda
+from machine_learning import compute_machine_learning, ML_CORE_BUDGET
+from profiling import profile_stage, profile_events
+
+# Reproducible stage timings on synthetic data, compared against a stored baseline:
+#   python benchmark.py --suite quick --save-baseline     (on the reference commit)
+#   python benchmark.py --suite quick                     (after a change; exit 1 on regression)
+
+BENCHMARK_BASELINE = os.environ.get("EDA_BENCHMARK_BASELINE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json"))
+# A stage regresses when it is this much slower / hungrier than the baseline...
+TIME_TOLERANCE = float(os.environ.get("EDA_BENCHMARK_TIME_TOLERANCE", 0.25))
+MEMORY_TOLERANCE = float(os.environ.get("EDA_BENCHMARK_MEMORY_TOLERANCE", 0.25))
+# ...and the difference is above the noise floor
+MIN_SECONDS = 0.05
+MIN_BYTES = 16 * 1024 ** 2
+
+BENCHMARK_STAGES = {
+    "infer_data_type": lambda df: {col: infer_data_type(df[col]) for col in df.columns},
+    "handle_missing_data": lambda df: handle_missing_data(df, "Fill missing data with median"),
+    "eda": compute_eda,
+    "machine_learning": lambda df: compute_machine_learning(df, cores=ML_CORE_BUDGET),
+}
+CHEAP_STAGES = ("infer_data_type", "handle_missing_data")
+
+def _case(rows, columns, stages=tuple(BENCHMARK_STAGES), **shape):
+    return dict(rows=rows, columns=columns, stages=stages, **shape)
+
+BENCHMARK_SUITES = {
+    "quick": [
+        _case(10_000, 5),
+        _case(100_000, 20, stages=("infer_data_type", "handle_missing_data", "eda")),
+        _case(10_000, 200, stages=("infer_data_type", "handle_missing_data", "eda"), null_ratio=0.2, cardinality=1_000),
+    ],
+    "full": [
+        _case(10_000, 5),
+        _case(100_000, 20),
+        _case(1_000_000, 20, stages=("infer_data_type", "handle_missing_data", "eda")),
+        _case(10_000_000, 10, stages=("infer_data_type", "handle_missing_data", "eda")),
+        _case(50_000_000, 5, stages=CHEAP_STAGES),
+        _case(10_000, 500, stages=("infer_data_type", "handle_missing_data", "eda"), cardinality=5_000),
+        _case(10_000, 5_000, stages=CHEAP_STAGES, null_ratio=0.3),
+        _case(1_000_000, 20, stages=CHEAP_STAGES, datetime_share=0.4, text_share=0.4),
+    ],
+}
+
+def synthetic_frame(rows, columns, null_ratio=0.05, cardinality=50, datetime_share=0.1, text_share=0.1,
+                    categorical_share=0.2, seed=0):
+    # Same arguments, same frame: every column has its own generator seeded from (seed, column)
+    kinds = (["datetime"] * round(columns * datetime_share) + ["text"] * round(columns * text_share)
+             + ["categorical"] * round(columns * categorical_share))[:columns]
+    kinds += ["numeric"] * (columns - len(kinds))
+    labels = np.array([f"label_{i}" for i in range(max(cardinality, 1))], dtype=object)
+    data = {}
+    for i, kind in enumerate(kinds):
+        rng = np.random.default_rng([seed, i])
+        missing = rng.random(rows) < null_ratio
+        if kind == "numeric":
+            if i % 3 == 0:
+                # Integer-valued columns end up float64 once they hold NaN, like a parsed CSV
+                values = rng.integers(0, 1_000, rows).astype(np.float64)
+            else:
+                values = rng.lognormal(2, 1, rows) if i % 3 == 1 else rng.normal(100, 15, rows)
+            values[missing] = np.nan
+        elif kind == "datetime":
+            values = np.datetime64("2020-01-01", "s") + rng.integers(0, 4 * 365 * 86_400, rows).astype("timedelta64[s]")
+            values = values.astype("datetime64[ns]")
+            values[missing] = np.datetime64("NaT")
+        elif kind == "categorical":
+            values = labels[rng.integers(0, len(labels), rows)]
+            values[missing] = None
+        else:
+            values = np.char.add("note ", rng.integers(0, max(rows, 1), rows).astype(str)).astype(object)
+            values[missing] = None
+        data[f"{kind}_{i}"] = values
+    return pd.DataFrame(data)
+
+def case_id(case):
+    shape = {key: value for key, value in case.items() if key not in ("rows", "columns", "stages")}
+    extra = "".join(f",{key}={value}" for key, value in sorted(shape.items()))
+    return f"{case['rows']}x{case['columns']}{extra}"
+
+def _run_stage(case, stage):
+    # Runs in a fresh process so allocations from other stages cannot hide this one's
+    shape = {key: value for key, value in case.items() if key != "stages"}
+    started = time.perf_counter()
+    df = synthetic_frame(**shape)
+    generate_seconds = time.perf_counter() - started
+    with profile_stage(stage, df):
+        BENCHMARK_STAGES[stage](df)
+    event = profile_events()[-1]
+    return {
+        "case": case_id(case),
+        "stage": stage,
+        "rows": case["rows"],
+        "columns": case["columns"],
+        "generate_s": generate_seconds,
+        "wall_s": event["wall_s"],
+        "cpu_s": event["cpu_s"],
+        "peak_bytes": event["peak_rss_delta_bytes"],
+    }
+
+def _isolated(func, *args):
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(method)) as executor:
+        return executor.submit(func, *args).result()
+
+def run_benchmarks(cases, stages=None, repeat=3, on_result=None):
+    # Best of `repeat` runs per stage; the minimum is the least noisy estimate
+    results = []
+    for case in cases:
+        for stage in case["stages"]:
+            if stages and stage not in stages:
+                continue
+            runs = [_isolated(_run_stage, case, stage) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run["wall_s"])
+            result = {
+                "case": best["case"], "stage": stage, "rows": best["rows"], "columns": best["columns"],
+                "wall_s": best["wall_s"], "cpu_s": min(run["cpu_s"] for run in runs),
+                "peak_bytes": min((run["peak_bytes"] for run in runs if run["peak_bytes"] is not None), default=None),
+                "runs": [run["wall_s"] for run in runs],
+            }
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def _change(current, previous, tolerance, floor):
+    if current is None or previous is None:
+        return None, "n/a"
+    ratio = current / previous if previous else float('inf')
+    if current - previous > floor and ratio > 1 + tolerance:
+        return ratio, "regression"
+    if previous - current > floor and ratio < 1 - tolerance:
+        return ratio, "improvement"
+    return ratio, "ok"
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    previous = {(row["case"], row["stage"]): row for row in baseline["results"]}
+    rows = []
+    for result in results:
+        base = previous.get((result["case"], result["stage"]))
+        if base is None:
+            rows.append({"case": result["case"], "stage": result["stage"], "status": "new"})
+            continue
+        time_ratio, time_status = _change(result["wall_s"], base["wall_s"], time_tolerance, MIN_SECONDS)
+        memory_ratio, memory_status = _change(result["peak_bytes"], base["peak_bytes"], memory_tolerance, MIN_BYTES)
+        statuses = (time_status, memory_status)
+        rows.append({
+            "case": result["case"],
+            "stage": result["stage"],
+            "wall_s": result["wall_s"],
+            "baseline_wall_s": base["wall_s"],
+            "time_ratio": time_ratio,
+            "peak_mb": result["peak_bytes"] / 1024 ** 2 if result["peak_bytes"] is not None else None,
+            "baseline_peak_mb": base["peak_bytes"] / 1024 ** 2 if base["peak_bytes"] is not None else None,
+            "memory_ratio": memory_ratio,
+            "status": "regression" if "regression" in statuses else "improvement" if "improvement" in statuses else "ok",
+        })
+    return pd.DataFrame(rows)
+
+def load_baseline(path=BENCHMARK_BASELINE):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+def save_baseline(results, path=BENCHMARK_BASELINE):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump({"environment": environment(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results},
+                  handle, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EDA stages on deterministic synthetic data.")
+    parser.add_argument("--suite", choices=BENCHMARK_SUITES, default="quick")
+    parser.add_argument("--stages", help=f"Comma-separated subset of: {', '.join(BENCHMARK_STAGES)}.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--output", help="Also write the raw results as JSON.")
+    # A single custom case instead of a suite
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--null-ratio", type=float, default=0.05)
+    parser.add_argument("--cardinality", type=int, default=50)
+    parser.add_argument("--datetime-share", type=float, default=0.1)
+    parser.add_argument("--text-share", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stages = args.stages.split(",") if args.stages else None
+    if stages and not set(stages) <= set(BENCHMARK_STAGES):
+        parser.error(f"unknown stage(s): {', '.join(sorted(set(stages) - set(BENCHMARK_STAGES)))}")
+    if args.rows:
+        cases = [_case(args.rows, args.columns, null_ratio=args.null_ratio, cardinality=args.cardinality,
+                       datetime_share=args.datetime_share, text_share=args.text_share, seed=args.seed)]
+    else:
+        cases = BENCHMARK_SUITES[args.suite]
+
+    results = run_benchmarks(cases, stages, args.repeat, on_result=lambda result: print(
+        f"{result['case']:<40} {result['stage']:<20} {result['wall_s']:9.3f}s "
+        f"{(result['peak_bytes'] or 0) / 1024 ** 2:9.1f} MB", flush=True))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({"environment": environment(), "results": results}, handle, indent=2)
+
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    if baseline.get("environment") != environment():
+        print(f"Warning: baseline was recorded on {baseline.get('environment')}, this run is on {environment()}.")
+    comparison = compare(results, baseline)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(comparison.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    regressions = comparison[comparison["status"] == "regression"]
+    if len(regressions):
+        print(f"{len(regressions)} regression(s) against the baseline.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+from lazy_imports import lazy_import
+from sketches import SKETCH_ROW_THRESHOLD, KLLSketch
+
+go = lazy_import("plotly.graph_objects")
+plotly_subplots = lazy_import("plotly.subplots")
+
+HISTOGRAM_BINS = 50
+BOX_OUTLIER_POINTS = 50
+BAR_MAX_CATEGORIES = 50
+# Above this many rows scatter-type plots switch to density rasters and samples
+SCATTER_ROW_THRESHOLD = int(os.environ.get("EDA_SCATTER_ROW_THRESHOLD", 20_000))
+SCATTER_SAMPLE_POINTS = 5_000
+SCATTER_OUTLIER_POINTS = 500
+DENSITY_BINS = 120
+STRATA_BINS = 10
+
+def histogram_summary(series, bins=HISTOGRAM_BINS):
+    # Everything the histogram + box plot needs, independent of the row count
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+
+    if len(values) > SKETCH_ROW_THRESHOLD:
+        q1, median, q3 = KLLSketch(seed=0).update(values).quantiles([0.25, 0.5, 0.75])
+    else:
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(outliers) > BOX_OUTLIER_POINTS:
+        # Keep the most extreme points on both sides
+        order = np.argsort(np.abs(outliers - median))
+        outliers = outliers[order[-BOX_OUTLIER_POINTS:]]
+
+    return {
+        "edges": edges,
+        "counts": counts,
+        "count": len(values),
+        "mean": float(values.mean()),
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(inside.min()) if len(inside) else float(q1),
+        "upperfence": float(inside.max()) if len(inside) else float(q3),
+        "outliers": outliers,
+    }
+
+def histogram_figure(summary, column, title):
+    fig = plotly_subplots.make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    fig.add_trace(go.Box(
+        y=[column], q1=[summary["q1"]], median=[summary["median"]], q3=[summary["q3"]],
+        lowerfence=[summary["lowerfence"]], upperfence=[summary["upperfence"]], mean=[summary["mean"]],
+        orientation='h', name=column, showlegend=False, boxpoints=False,
+    ), row=1, col=1)
+    if len(summary["outliers"]):
+        fig.add_trace(go.Scatter(
+            x=summary["outliers"], y=[column] * len(summary["outliers"]),
+            mode='markers', name="outliers", showlegend=False,
+        ), row=1, col=1)
+    edges = summary["edges"]
+    fig.add_trace(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=summary["counts"], width=np.diff(edges),
+        name=column, showlegend=False,
+        customdata=np.stack([edges[:-1], edges[1:]], axis=1),
+        hovertemplate="%{customdata[0]:.4g} to %{customdata[1]:.4g}<br>count=%{y}<extra></extra>",
+    ), row=2, col=1)
+    fig.update_layout(title=title, bargap=0)
+    fig.update_xaxes(title_text=column, row=2, col=1)
+    fig.update_yaxes(title_text="count", row=2, col=1)
+    return fig
+
+def category_counts(series, max_categories=BAR_MAX_CATEGORIES):
+    # Long tails are folded into one bar so the payload stays bounded
+    value_counts = series.value_counts()
+    if len(value_counts) > max_categories:
+        other = value_counts.iloc[max_categories:].sum()
+        hidden = len(value_counts) - max_categories
+        value_counts = value_counts.iloc[:max_categories].copy()
+        value_counts[f"Other ({hidden} more)"] = other
+    value_counts = value_counts.reset_index()
+    value_counts.columns = ['category', 'count']
+    value_counts['category'] = value_counts['category'].astype(str)
+    return value_counts
+def _outliers(values, max_points):
+    # Rows outside the IQR fences in any column; when capped, each column keeps
+    # its own most extreme rows so one heavy-tailed column cannot crowd out the rest
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75], axis=0)
+    iqr = q3 - q1
+    beyond = (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+    is_outlier = beyond.any(axis=1)
+    outliers = np.flatnonzero(is_outlier)
+    if len(outliers) > max_points:
+        per_column = max(1, max_points // values.shape[1])
+        extremeness = np.where(beyond[outliers], np.abs(values[outliers] - median), -1)
+        keep = [outliers[np.argsort(extremeness[:, i])[-per_column:]] for i in range(values.shape[1])]
+        keep = np.unique(np.concatenate(keep))
+        outliers = keep[beyond[keep].any(axis=1)]
+    return is_outlier, outliers
+
+def outlier_positions(values, max_points=SCATTER_OUTLIER_POINTS):
+    complete = np.flatnonzero(np.isfinite(values).all(axis=1))
+    if len(complete) == 0:
+        return complete
+    return complete[_outliers(values[complete], max_points)[1]]
+
+def stratified_sample(values, n=SCATTER_SAMPLE_POINTS, max_outliers=SCATTER_OUTLIER_POINTS, seed=0):
+    # values is a rows x columns float array; returns row positions of complete rows.
+    # Outliers are always kept and the rest is sampled proportionally over a quantile
+    # grid of the first two columns, so sparse regions do not vanish.
+    rng = np.random.default_rng(seed)
+    complete = np.flatnonzero(np.isfinite(values).all(axis=1))
+    if len(complete) <= n + max_outliers:
+        return complete
+    values = values[complete]
+    is_outlier, outliers = _outliers(values, max_outliers)
+
+    stratum = np.zeros(len(values), dtype=np.int64)
+    for i in range(min(2, values.shape[1])):
+        edges = np.unique(np.quantile(values[:, i], np.linspace(0, 1, STRATA_BINS + 1)[1:-1]))
+        stratum = stratum * STRATA_BINS + np.searchsorted(edges, values[:, i], side='right')
+    inliers = np.flatnonzero(~is_outlier)
+    stratum = stratum[inliers]
+    sizes = np.bincount(stratum)
+    # Proportional allocation, but every occupied stratum expects at least one point
+    keep_rate = np.minimum(1, np.maximum(sizes * n / max(len(inliers), 1), 1) / np.maximum(sizes, 1))
+    sampled = inliers[rng.random(len(inliers)) < keep_rate[stratum]]
+    return complete[np.sort(np.concatenate([sampled, outliers]))]
+
+def density_figure(x, y, x_label, y_label, title, bins=DENSITY_BINS):
+    # 2D count raster on a log colour scale; empty cells stay transparent
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    counts = counts.T
+    with np.errstate(divide='ignore'):
+        z = np.where(counts > 0, np.log10(counts), np.nan)
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2, z=z,
+        customdata=counts, colorscale='Viridis', colorbar=dict(title="log10(rows)"),
+        hovertemplate=f"{x_label}=%{{x:.4g}}<br>{y_label}=%{{y:.4g}}<br>rows=%{{customdata:,.0f}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
\ No newline at end of file
@@ -0,0 +1,616 @@
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from lazy_imports import lazy_import
+from data_utils import CATEGORY_RATIO, preprocess_column
+from chart_data import HISTOGRAM_BINS, BOX_OUTLIER_POINTS, BAR_MAX_CATEGORIES
+
+# Pandas holds the whole dataset in memory. For CSV files that do not fit, the
+# DuckDB or Polars frames below query a columnar copy of the file on disk and
+# only bring summaries (counts, quantiles, histograms, correlations) back into
+# pandas. "auto" keeps pandas below OUT_OF_CORE_THRESHOLD_BYTES.
+
+duckdb = lazy_import("duckdb", optional=True)
+pl = lazy_import("polars", optional=True)
+
+COMPUTE_BACKEND = os.environ.get("EDA_COMPUTE_BACKEND", "auto")
+OUT_OF_CORE_BACKENDS = ("duckdb", "polars")
+OUT_OF_CORE_THRESHOLD_BYTES = int(os.environ.get("EDA_OUT_OF_CORE_BYTES", 1024 ** 3))
+# Distinct counts decide categorical vs text, so they are exact up to this file
+# size; larger files use each engine's approximate (HyperLogLog) count
+EXACT_DISTINCT_MAX_BYTES = int(os.environ.get("EDA_EXACT_DISTINCT_BYTES", OUT_OF_CORE_THRESHOLD_BYTES))
+# DuckDB spills sorts and aggregations to SPILL_DIR beyond this
+DUCKDB_MEMORY_LIMIT = os.environ.get("EDA_DUCKDB_MEMORY_LIMIT", "2GB")
+SPILL_DIR = os.environ.get("EDA_SPILL_DIR", os.path.join(tempfile.gettempdir(), "eda_spill"))
+# Visualizations, models and reports work on a sample of this many rows
+IN_MEMORY_SAMPLE_ROWS = int(os.environ.get("EDA_IN_MEMORY_SAMPLE_ROWS", 200_000))
+OUTLIER_PREVIEW_ROWS = 1_000
+# Quantiles are read off this grid, computed in the same scan as the other statistics
+QUANTILE_GRID = np.linspace(0, 1, 21)
+STATS_CACHE_SIZE = 32
+
+# Column statistics keyed by frame key; frames are rebuilt on every Streamlit rerun
+_stats_cache = OrderedDict()
+
+def available_backends():
+    return ["pandas"] + [name for name, module in (("duckdb", duckdb), ("polars", pl)) if module is not None]
+
+def is_out_of_core(df):
+    return isinstance(df, OutOfCoreFrame)
+
+def choose_backend(uploaded_file, backend=COMPUTE_BACKEND):
+    # Only CSV files are queried in place; workbooks stay in pandas
+    if backend == "pandas" or not uploaded_file.name.lower().endswith('.csv'):
+        return "pandas"
+    if backend not in ("auto",) + OUT_OF_CORE_BACKENDS:
+        raise ValueError(f"Unknown compute backend '{backend}'; choose auto, pandas, {' or '.join(OUT_OF_CORE_BACKENDS)}.")
+    installed = [name for name in available_backends() if name != "pandas"]
+    if backend == "auto":
+        if not installed or getattr(uploaded_file, 'size', 0) <= OUT_OF_CORE_THRESHOLD_BYTES:
+            return "pandas"
+        return installed[0]
+    return backend if backend in installed else "pandas"
+
+def _file_key(path):
+    stat = os.stat(path)
+    return hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:20]
+
+def source_path(uploaded_file):
+    # Local files (batch mode) are read where they are; uploads are copied to disk once
+    if isinstance(uploaded_file, io.FileIO):
+        return os.path.abspath(uploaded_file.name)
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    upload_id = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    path = os.path.join(SPILL_DIR, hashlib.sha256(upload_id.encode()).hexdigest()[:20] + ".csv")
+    if not os.path.exists(path):
+        uploaded_file.seek(0)
+        with open(path + ".part", 'wb') as handle:
+            shutil.copyfileobj(uploaded_file, handle)
+        os.replace(path + ".part", path)
+        uploaded_file.seek(0)
+    return path
+
+def _columnar_copy(csv_path, engine, write):
+    # CSV has to be re-parsed on every query; one streaming pass to Parquet lets
+    # every later scan read only the columns it needs
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    key = _file_key(csv_path)
+    path = os.path.join(SPILL_DIR, f"{key}.{engine}.parquet")
+    if not os.path.exists(path):
+        write(csv_path, path + ".part")
+        os.replace(path + ".part", path)
+    return path, key
+
+def open_frame(uploaded_file, backend):
+    frame_class = {"duckdb": DuckDBFrame, "polars": PolarsFrame}[backend]
+    return frame_class.from_csv(source_path(uploaded_file))
+
+def numeric_columns(df):
+    # Numeric, bool excluded, as select_dtypes(include=[np.number]) gives for pandas
+    if is_out_of_core(df):
+        return [col for col, kind in df.kinds().items() if kind == 'numeric']
+    return df.select_dtypes(include=[np.number]).columns
+
+def in_memory_frame(df, rows=IN_MEMORY_SAMPLE_ROWS):
+    # Stages that need every value in memory get a typed random sample
+    if not is_out_of_core(df):
+        return df
+    return df.sample(rows).apply(preprocess_column)
+
+class EngineSketch:
+    # Engine results behind the interface of the streaming sketches (count() /
+    # quantiles()), so sketch_summary and outlier_bounds take them unchanged
+    def __init__(self, distinct=None, quantile_values=None):
+        self.distinct = distinct
+        self.quantile_values = quantile_values
+
+    def count(self):
+        return self.distinct
+
+    def quantiles(self, qs):
+        return np.interp(qs, QUANTILE_GRID, self.quantile_values)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+class OutOfCoreFrame:
+    # A dataset that stays on disk. Cleaning steps (drop/fill nulls, filter or
+    # clip ranges) are recorded and compiled into every query; each step gives a
+    # new frame, like the pandas functions return new frames.
+    engine = None
+
+    def __init__(self, path, key, steps=()):
+        self.path = path
+        self.steps = tuple(steps)
+        self.key = f"{self.engine}:{key}:{hashlib.sha256(repr(self.steps).encode()).hexdigest()[:12]}" if steps else f"{self.engine}:{key}"
+        self._base_key = key
+        self._schema = None
+
+    def _with(self, step):
+        return type(self)(self.path, self._base_key, self.steps + (step,))
+
+    def drop_nulls(self, columns):
+        return self._with(("drop_nulls", tuple(columns))) if len(columns) else self
+
+    def fill_nulls(self, values):
+        values = {col: value for col, value in values.items() if not (isinstance(value, float) and np.isnan(value))}
+        return self._with(("fill_nulls", tuple(values.items()))) if values else self
+
+    def between(self, column, lower, upper):
+        return self._with(("between", column, float(lower), float(upper)))
+
+    def clip(self, column, lower, upper):
+        return self._with(("clip", column, float(lower), float(upper)))
+
+    @property
+    def columns(self):
+        return list(self.schema())
+
+    @property
+    def dtypes(self):
+        return pd.Series({col: str(dtype) for col, dtype in self.schema().items()}, dtype=object)
+
+    @property
+    def shape(self):
+        return self.column_stats()[1], len(self.schema())
+
+    @property
+    def empty(self):
+        return self.shape[0] == 0 or self.shape[1] == 0
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.path} steps={len(self.steps)}>"
+
+    def schema(self):
+        if self._schema is None:
+            self._schema = self._read_schema()
+        return self._schema
+
+    def kinds(self):
+        return {col: self._kind(dtype) for col, dtype in self.schema().items()}
+
+    def _exact_distinct(self):
+        return os.path.getsize(self.path) <= EXACT_DISTINCT_MAX_BYTES
+
+    def column_stats(self):
+        # One scan for nulls, distinct counts, ranges, moments and the quantile grid
+        cached = _stats_cache.get(self.key)
+        if cached is None:
+            cached = self._compute_stats()
+            _stats_cache[self.key] = cached
+            while len(_stats_cache) > STATS_CACHE_SIZE:
+                _stats_cache.popitem(last=False)
+        else:
+            _stats_cache.move_to_end(self.key)
+        return cached
+
+    def profile(self):
+        # Same columns as data_utils.profile_dataframe
+        stats, rows = self.column_stats()
+        kinds = self.kinds()
+        dtype_class = {}
+        for col, kind in kinds.items():
+            if kind in ('numeric', 'bool'):
+                dtype_class[col] = 'numeric'
+            elif kind == 'datetime':
+                dtype_class[col] = 'datetime'
+            else:
+                dtype_class[col] = 'categorical' if rows and stats.at[col, 'nunique'] / rows < CATEGORY_RATIO else 'text'
+        return pd.DataFrame({
+            'dtype_class': pd.Series(dtype_class, dtype=object),
+            'null_count': stats['null_count'],
+            'non_null_count': rows - stats['null_count'],
+            'nunique': stats['nunique'],
+            'min': stats['min'],
+            'max': stats['max'],
+            'cardinality_ratio': stats['nunique'] / rows if rows else 0.0,
+        }, index=self.columns)
+
+    def sketches(self, columns=None):
+        # Shaped like sketches.sketch_frame's result
+        stats, rows = self.column_stats()
+        columns = self.columns if columns is None else columns
+        return {col: {
+            'rows': rows,
+            'null_count': int(stats.at[col, 'null_count']),
+            'distinct': EngineSketch(distinct=int(stats.at[col, 'nunique'])),
+            'quantiles': EngineSketch(quantile_values=stats.at[col, 'quantiles']) if stats.at[col, 'quantiles'] is not None else None,
+        } for col in columns}
+
+    def moments(self, column):
+        stats = self.column_stats()[0]
+        return stats.at[column, 'skew'], stats.at[column, 'kurtosis']
+
+    def histogram_summary(self, column, bins=HISTOGRAM_BINS):
+        # Same dict as chart_data.histogram_summary, from three engine queries
+        stats, rows = self.column_stats()
+        count = rows - int(stats.at[column, 'null_count'])
+        if count == 0 or stats.at[column, 'quantiles'] is None:
+            return None
+        low, high = float(stats.at[column, 'min']), float(stats.at[column, 'max'])
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        counts = self._histogram(column, low, high, bins)
+        q1, median, q3 = np.interp([0.25, 0.5, 0.75], QUANTILE_GRID, stats.at[column, 'quantiles'])
+        iqr = q3 - q1
+        lowerfence, upperfence, outliers = self._box_extremes(column, q1 - 1.5 * iqr, q3 + 1.5 * iqr, median, BOX_OUTLIER_POINTS)
+        return {
+            "edges": edges,
+            "counts": counts,
+            "count": count,
+            "mean": float(stats.at[column, 'mean']),
+            "q1": float(q1),
+            "median": float(median),
+            "q3": float(q3),
+            "lowerfence": float(lowerfence) if lowerfence is not None else float(q1),
+            "upperfence": float(upperfence) if upperfence is not None else float(q3),
+            "outliers": np.asarray(outliers, dtype=np.float64),
+        }
+
+    def category_counts(self, column, max_categories=BAR_MAX_CATEGORIES):
+        # Same frame as chart_data.category_counts
+        top, groups, total = self._top_values(column, max_categories)
+        counts = pd.DataFrame({'category': top[0].astype(str), 'count': top[1].astype(np.int64)})
+        if groups > max_categories:
+            other = pd.DataFrame({'category': [f"Other ({groups - max_categories} more)"], 'count': [total - counts['count'].sum()]})
+            counts = pd.concat([counts, other], ignore_index=True)
+        return counts
+
+    def sample(self, rows=IN_MEMORY_SAMPLE_ROWS, seed=42):
+        if len(self) <= rows:
+            return self.to_pandas()
+        return self._sample(rows, seed)
+
+    def fill_values(self, columns, how):
+        # Column -> mean/median/mode, for fill_nulls
+        return self._aggregate_values(columns, how) if columns else {}
+
+class DuckDBFrame(OutOfCoreFrame):
+    engine = "duckdb"
+    _NUMERIC_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT',
+                      'UINTEGER', 'UBIGINT', 'UHUGEINT', 'FLOAT', 'DOUBLE', 'REAL')
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        def write(source, target):
+            _duckdb_connection().execute(
+                f"COPY (SELECT * FROM read_csv_auto({_sql_literal(source)})) TO {_sql_literal(target)} (FORMAT parquet)")
+        path, key = _columnar_copy(csv_path, cls.engine, write)
+        return cls(path, key)
+
+    def _kind(self, dtype):
+        dtype = str(dtype)
+        if dtype == 'BOOLEAN':
+            return 'bool'
+        if dtype in self._NUMERIC_TYPES or dtype.startswith('DECIMAL'):
+            return 'numeric'
+        if dtype.startswith(('DATE', 'TIMESTAMP')):
+            return 'datetime'
+        return 'label'
+
+    def _sql(self):
+        sql = f"SELECT * FROM read_parquet({_sql_literal(self.path)})"
+        for position, step in enumerate(self.steps):
+            if step[0] == "drop_nulls":
+                sql = f"SELECT * FROM ({sql}) WHERE " + " AND ".join(f"{_ident(col)} IS NOT NULL" for col in step[1])
+            elif step[0] == "fill_nulls":
+                kinds = type(self)(self.path, self._base_key, self.steps[:position]).kinds()
+                fills = ", ".join(
+                    f"COALESCE(CAST({_ident(col)} AS DOUBLE), {_sql_literal(value)}) AS {_ident(col)}"
+                    if kinds[col] in ('numeric', 'bool') else f"COALESCE({_ident(col)}, {_sql_literal(value)}) AS {_ident(col)}"
+                    for col, value in step[1])
+                sql = f"SELECT * REPLACE ({fills}) FROM ({sql})"
+            elif step[0] == "between":
+                _, col, lower, upper = step
+                sql = f"SELECT * FROM ({sql}) WHERE {_ident(col)} BETWEEN {lower!r} AND {upper!r}"
+            elif step[0] == "clip":
+                _, col, lower, upper = step
+                # NULLs stay NULL, as with Series.clip
+                clipped = f"CASE WHEN {_ident(col)} < {lower!r} THEN {lower!r} WHEN {_ident(col)} > {upper!r} THEN {upper!r} ELSE {_ident(col)} END"
+                sql = f"SELECT * REPLACE ({clipped} AS {_ident(col)}) FROM ({sql})"
+        return sql
+
+    def _query(self, sql):
+        return _duckdb_connection().execute(sql)
+
+    def _read_schema(self):
+        relation = _duckdb_connection().sql(self._sql())
+        return dict(zip(relation.columns, relation.types))
+
+    def _compute_stats(self):
+        kinds = self.kinds()
+        grid = "[" + ", ".join(repr(float(q)) for q in QUANTILE_GRID) + "]"
+        selects = ["count(*)"]
+        distinct = "count(DISTINCT {})" if self._exact_distinct() else "approx_count_distinct({})"
+        for col, kind in kinds.items():
+            column = _ident(col)
+            selects += [f"count({column})", distinct.format(column)]
+            if kind != 'label':
+                selects += [f"min({column})", f"max({column})"]
+            if kind in ('numeric', 'bool'):
+                value = f"CAST({column} AS DOUBLE)"
+                selects += [f"avg({value})", f"stddev_samp({value})", f"skewness({value})", f"kurtosis({value})",
+                            f"approx_quantile({value}, {grid})"]
+        values = iter(self._query(f"SELECT {', '.join(selects)} FROM ({self._sql()})").fetchone())
+        rows = int(next(values))
+        stats = {}
+        for col, kind in kinds.items():
+            non_null, distinct = next(values), next(values)
+            low, high = (next(values), next(values)) if kind != 'label' else (None, None)
+            mean = std = skew = kurtosis = quantiles = None
+            if kind in ('numeric', 'bool'):
+                mean, std, skew, kurtosis, quantiles = (next(values) for _ in range(5))
+                quantiles = np.asarray(quantiles, dtype=np.float64) if quantiles is not None and non_null else None
+            stats[col] = {'null_count': rows - int(non_null), 'nunique': min(int(distinct), int(non_null)), 'min': low, 'max': high,
+                          'mean': mean, 'std': std, 'skew': skew, 'kurtosis': kurtosis, 'quantiles': quantiles}
+        return pd.DataFrame.from_dict(stats, orient='index').reindex(self.columns), rows
+
+    def head(self, n=5):
+        return self._query(f"SELECT * FROM ({self._sql()}) LIMIT {int(n)}").df()
+
+    def to_pandas(self):
+        return self._query(self._sql()).df()
+
+    def _sample(self, rows, seed):
+        return self._query(f"SELECT * FROM ({self._sql()}) USING SAMPLE reservoir({int(rows)} ROWS) REPEATABLE ({int(seed)})").df()
+
+    def iter_chunks(self, chunk_rows):
+        result = self._query(self._sql())
+        # fetch_df_chunk works in vectors of 2048 rows
+        vectors = max(1, chunk_rows // 2048)
+        while True:
+            chunk = result.fetch_df_chunk(vectors)
+            if chunk.empty:
+                return
+            yield chunk
+
+    def _histogram(self, column, low, high, bins):
+        value = f"CAST({_ident(column)} AS DOUBLE)"
+        width = (high - low) / bins
+        rows = self._query(
+            f"SELECT least(CAST(floor(({value} - {low!r}) / {width!r}) AS BIGINT), {bins - 1}) AS bin, count(*) "
+            f"FROM ({self._sql()}) WHERE {value} IS NOT NULL GROUP BY bin").fetchall()
+        counts = np.zeros(bins, dtype=np.int64)
+        for bin_index, count in rows:
+            counts[bin_index] = count
+        return counts
+
+    def _box_extremes(self, column, lower, upper, median, limit):
+        value = f"CAST({_ident(column)} AS DOUBLE)"
+        lower, upper, median = float(lower), float(upper), float(median)
+        source = f"({self._sql()})"
+        inside_low, inside_high = self._query(
+            f"SELECT min({value}), max({value}) FROM {source} WHERE {value} BETWEEN {lower!r} AND {upper!r}").fetchone()
+        outliers = self._query(
+            f"SELECT {value} FROM {source} WHERE {value} < {lower!r} OR {value} > {upper!r} "
+            f"ORDER BY abs({value} - {median!r}) DESC LIMIT {int(limit)}").fetchall()
+        return inside_low, inside_high, [row[0] for row in outliers]
+
+    def _top_values(self, column, limit):
+        column = _ident(column)
+        rows = self._query(
+            f"SELECT category, n, count(*) OVER () AS groups, sum(n) OVER () AS total FROM ("
+            f"SELECT {column} AS category, count(*) AS n FROM ({self._sql()}) WHERE {column} IS NOT NULL GROUP BY {column}"
+            f") ORDER BY n DESC LIMIT {int(limit)}").fetchall()
+        if not rows:
+            return (pd.Series([], dtype=object), pd.Series([], dtype=np.int64)), 0, 0
+        return (pd.Series([row[0] for row in rows]), pd.Series([row[1] for row in rows])), int(rows[0][2]), int(rows[0][3])
+
+    def outside(self, column, lower, upper, limit=OUTLIER_PREVIEW_ROWS):
+        # Number of rows outside [lower, upper] and the first `limit` of them
+        condition = f"{_ident(column)} < {float(lower)!r} OR {_ident(column)} > {float(upper)!r}"
+        source = f"({self._sql()})"
+        count = self._query(f"SELECT count(*) FROM {source} WHERE {condition}").fetchone()[0]
+        preview = self._query(f"SELECT * FROM {source} WHERE {condition} LIMIT {int(limit)}").df() if count else self.head(0)
+        return int(count), preview
+
+    def _aggregate_values(self, columns, how):
+        if how == 'mode':
+            selects = [f"mode({_ident(col)})" for col in columns]
+        else:
+            function = 'avg' if how == 'mean' else 'median'
+            selects = [f"{function}(CAST({_ident(col)} AS DOUBLE))" for col in columns]
+        values = self._query(f"SELECT {', '.join(selects)} FROM ({self._sql()})").fetchone()
+        return {col: value for col, value in zip(columns, values) if value is not None}
+
+    def correlation_matrix(self, columns, method='pearson'):
+        source = f"({self._sql()})"
+        if method == 'spearman':
+            # Average ranks of non-null values, like DataFrame.rank()
+            ranks = ", ".join(
+                f"CASE WHEN {_ident(col)} IS NULL THEN NULL ELSE "
+                f"(rank() OVER (ORDER BY {_ident(col)} ASC NULLS LAST) + count({_ident(col)}) OVER () "
+                f"- rank() OVER (ORDER BY {_ident(col)} DESC NULLS LAST) + 1) / 2.0 END AS c{i}"
+                for i, col in enumerate(columns))
+        else:
+            ranks = ", ".join(f"CAST({_ident(col)} AS DOUBLE) AS c{i}" for i, col in enumerate(columns))
+        pairs = [(i, j) for i in range(len(columns)) for j in range(i + 1, len(columns))]
+        values = self._query(f"SELECT {', '.join(f'corr(c{i}, c{j})' for i, j in pairs)} FROM (SELECT {ranks} FROM {source})").fetchone() if pairs else ()
+        return _pairs_to_matrix(len(columns), pairs, values)
+
+class PolarsFrame(OutOfCoreFrame):
+    engine = "polars"
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        def write(source, target):
+            # Unparseable values become nulls, like pd.to_numeric(errors='coerce')
+            pl.scan_csv(source, try_parse_dates=True, ignore_errors=True, infer_schema_length=10_000).sink_parquet(target)
+        path, key = _columnar_copy(csv_path, cls.engine, write)
+        return cls(path, key)
+
+    def _kind(self, dtype):
+        if dtype == pl.Boolean:
+            return 'bool'
+        if dtype.is_numeric():
+            return 'numeric'
+        if dtype in (pl.Date, pl.Datetime) or isinstance(dtype, pl.Datetime):
+            return 'datetime'
+        return 'label'
+
+    def _lazy(self):
+        frame = pl.scan_parquet(self.path)
+        for step in self.steps:
+            if step[0] == "drop_nulls":
+                frame = frame.drop_nulls(subset=list(step[1]))
+            elif step[0] == "fill_nulls":
+                schema = frame.collect_schema()
+                frame = frame.with_columns([
+                    pl.col(col).cast(pl.Float64).fill_null(value) if self._kind(schema[col]) in ('numeric', 'bool')
+                    else pl.col(col).fill_null(value)
+                    for col, value in step[1]])
+            elif step[0] == "between":
+                _, col, lower, upper = step
+                frame = frame.filter(pl.col(col).is_between(lower, upper))
+            elif step[0] == "clip":
+                _, col, lower, upper = step
+                frame = frame.with_columns(pl.col(col).cast(pl.Float64).clip(lower, upper))
+        return frame
+
+    def _collect(self, frame):
+        return frame.collect(engine="streaming")
+
+    def _read_schema(self):
+        return dict(self._lazy().collect_schema())
+
+    def _compute_stats(self):
+        kinds = self.kinds()
+        exprs = [pl.len().alias("rows")]
+        exact = self._exact_distinct()
+        for i, (col, kind) in enumerate(kinds.items()):
+            column = pl.col(col)
+            distinct = column.drop_nulls().n_unique() if exact else column.drop_nulls().approx_n_unique()
+            exprs += [column.null_count().alias(f"{i}_nulls"), distinct.alias(f"{i}_distinct")]
+            if kind != 'label':
+                exprs += [column.min().alias(f"{i}_min"), column.max().alias(f"{i}_max")]
+            if kind in ('numeric', 'bool'):
+                value = column.cast(pl.Float64)
+                exprs += [value.mean().alias(f"{i}_mean"), value.std().alias(f"{i}_std"),
+                          value.skew(bias=False).alias(f"{i}_skew"), value.kurtosis(bias=False).alias(f"{i}_kurtosis")]
+                exprs += [value.quantile(float(q), interpolation='linear').alias(f"{i}_q{k}") for k, q in enumerate(QUANTILE_GRID)]
+        result = self._collect(self._lazy().select(exprs)).row(0, named=True)
+        rows = int(result["rows"])
+        stats = {}
+        for i, (col, kind) in enumerate(kinds.items()):
+            null_count = int(result[f"{i}_nulls"])
+            numeric = kind in ('numeric', 'bool')
+            quantiles = np.array([result[f"{i}_q{k}"] for k in range(len(QUANTILE_GRID))], dtype=np.float64) if numeric and rows > null_count else None
+            stats[col] = {'null_count': null_count, 'nunique': int(result[f"{i}_distinct"]),
+                          'min': result.get(f"{i}_min"), 'max': result.get(f"{i}_max"),
+                          'mean': result.get(f"{i}_mean"), 'std': result.get(f"{i}_std"),
+                          'skew': result.get(f"{i}_skew"), 'kurtosis': result.get(f"{i}_kurtosis"), 'quantiles': quantiles}
+        return pd.DataFrame.from_dict(stats, orient='index').reindex(self.columns), rows
+
+    def head(self, n=5):
+        return self._collect(self._lazy().head(n)).to_pandas()
+
+    def to_pandas(self):
+        return self._collect(self._lazy()).to_pandas()
+
+    def _sample(self, rows, seed):
+        # Bernoulli sample on a row hash, so the scan can stream. The rate is padded
+        # by four standard deviations so the sample almost never falls short, and
+        # the rows with the smallest hashes are kept, which is still uniform
+        fraction = (rows + 4 * np.sqrt(rows) + 10) / len(self)
+        threshold = min(int(fraction * 2 ** 64), 2 ** 64 - 1)
+        frame = (self._lazy().with_row_index("__row").with_columns(pl.col("__row").hash(seed).alias("__hash"))
+                 .filter(pl.col("__hash") < threshold))
+        sample = self._collect(frame).bottom_k(rows, by="__hash").sort("__row")
+        return sample.drop("__row", "__hash").to_pandas()
+
+    def iter_chunks(self, chunk_rows):
+        for chunk in self._lazy().collect_batches(chunk_size=chunk_rows):
+            yield chunk.to_pandas()
+
+    def _histogram(self, column, low, high, bins):
+        width = (high - low) / bins
+        value = pl.col(column).cast(pl.Float64)
+        bin_index = ((value - low) / width).floor().clip(0, bins - 1).cast(pl.Int64).alias("bin")
+        result = self._collect(self._lazy().filter(value.is_not_null()).group_by(bin_index).agg(pl.len()))
+        counts = np.zeros(bins, dtype=np.int64)
+        counts[result["bin"].to_numpy()] = result["len"].to_numpy()
+        return counts
+
+    def _box_extremes(self, column, lower, upper, median, limit):
+        value = pl.col(column).cast(pl.Float64)
+        inside, outliers = pl.collect_all([
+            self._lazy().filter(value.is_between(lower, upper)).select(value.min().alias("low"), value.max().alias("high")),
+            self._lazy().filter((value < lower) | (value > upper)).select(value.alias("value"))
+                .sort((pl.col("value") - median).abs(), descending=True).head(limit),
+        ], engine="streaming")
+        return inside["low"][0], inside["high"][0], outliers["value"].to_list()
+
+    def _top_values(self, column, limit):
+        counts = self._lazy().filter(pl.col(column).is_not_null()).group_by(column).agg(pl.len().alias("n"))
+        top, totals = pl.collect_all([
+            counts.sort("n", descending=True).head(limit),
+            counts.select(pl.len().alias("groups"), pl.col("n").sum().alias("total")),
+        ], engine="streaming")
+        return (top[column].to_pandas(), top["n"].to_pandas()), int(totals["groups"][0]), int(totals["total"][0] or 0)
+
+    def outside(self, column, lower, upper, limit=OUTLIER_PREVIEW_ROWS):
+        condition = (pl.col(column) < lower) | (pl.col(column) > upper)
+        count, preview = pl.collect_all([
+            self._lazy().filter(condition).select(pl.len()),
+            self._lazy().filter(condition).head(limit),
+        ], engine="streaming")
+        return int(count.item()), preview.to_pandas()
+
+    def _aggregate_values(self, columns, how):
+        if how == 'mode':
+            exprs = [pl.col(col).drop_nulls().mode().sort().first().alias(col) for col in columns]
+        else:
+            exprs = [getattr(pl.col(col).cast(pl.Float64), how)().alias(col) for col in columns]
+        values = self._collect(self._lazy().select(exprs)).row(0, named=True)
+        return {col: value for col, value in values.items() if value is not None}
+
+    def correlation_matrix(self, columns, method='pearson'):
+        pairs = [(i, j) for i in range(len(columns)) for j in range(i + 1, len(columns))]
+        if not pairs:
+            return _pairs_to_matrix(len(columns), pairs, ())
+        exprs = [pl.corr(pl.col(columns[i]).cast(pl.Float64), pl.col(columns[j]).cast(pl.Float64), method=method).alias(f"{i}_{j}")
+                 for i, j in pairs]
+        return _pairs_to_matrix(len(columns), pairs, self._collect(self._lazy().select(exprs)).row(0))
+
+def _pairs_to_matrix(size, pairs, values):
+    matrix = np.full((size, size), np.nan)
+    np.fill_diagonal(matrix, 1.0)
+    for (i, j), value in zip(pairs, values):
+        if value is not None:
+            matrix[i, j] = matrix[j, i] = value
+    return matrix
+
+_duckdb_connections = {}
+
+def _duckdb_connection():
+    # One connection per process; Streamlit reruns and batch workers reuse it
+    connection = _duckdb_connections.get(os.getpid())
+    if connection is None:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        connection = duckdb.connect(config={"memory_limit": DUCKDB_MEMORY_LIMIT, "temp_directory": SPILL_DIR})
+        _duckdb_connections[os.getpid()] = connection
+    # Cursors share the database but are safe to use from Streamlit's script threads
+    return connection.cursor()
+
+def _ident(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, np.number)):
+        return repr(float(value))
+    if isinstance(value, pd.Timestamp):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    return "'" + str(value).replace("'", "''") + "'"
\ No newline at end of file
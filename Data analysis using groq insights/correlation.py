@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from lazy_imports import lazy_import
+
+CORRELATION_BLOCK_COLUMNS = 256
+TOP_CORRELATION_PAIRS = 50
+HEATMAP_MAX_COLUMNS = 40
+HEATMAP_ANNOTATE_MAX = 15
+
+hierarchy = lazy_import("scipy.cluster.hierarchy")
+spatial_distance = lazy_import("scipy.spatial.distance")
+
+def standardized_matrix(numeric_df, method='pearson'):
+    # Spearman is Pearson on ranks, so ranking once up front is all it takes.
+    # Centering and scaling happen in float64 (large offsets would swallow the
+    # variation in float32); only the unit-norm result is float32.
+    source = numeric_df.rank() if method == 'spearman' else numeric_df
+    values = source.to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(values)
+    counts = np.maximum((~missing).sum(axis=0), 1)
+    means = np.where(missing, 0, values).sum(axis=0) / counts
+    # Missing cells contribute nothing after centering; correlation_summary only
+    # takes this path for frames without missing values
+    values = np.where(missing, 0, values - means)
+    norms = np.sqrt(np.einsum('ij,ij->j', values, values))
+    varying = norms > 0
+    z = (values[:, varying] / norms[varying]).astype(np.float32)
+    return z, numeric_df.columns[varying], numeric_df.columns[~varying]
+
+def pairwise_standardized(numeric_df, method='pearson'):
+    # Pairwise-complete like DataFrame.corr: each pair only uses the rows where
+    # both columns have a value. Columns are centred and scaled in float64 so the
+    # float32 mask matmuls in pairwise_correlation_block only see O(1) values;
+    # neither shift nor scale changes a correlation.
+    source = numeric_df.rank() if method == 'spearman' else numeric_df
+    values = source.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    counts = np.maximum(present.sum(axis=0), 1)
+    values = np.where(present, values - np.where(present, values, 0).sum(axis=0) / counts, 0)
+    norms = np.sqrt(np.einsum('ij,ij->j', values, values))
+    values = (values / np.where(norms > 0, norms, 1)).astype(np.float32)
+    return values, values * values, present.astype(np.float32)
+
+def pairwise_correlation_block(x, squares, mask, rows, cols):
+    # Correlations of columns `rows` against `cols` over the rows both have;
+    # sums[i, j] is the sum of column i over the rows where column j is present
+    m_i, m_j = mask[:, rows], mask[:, cols]
+    n = (m_i.T @ m_j).astype(np.float64)
+    sums_i = (x[:, rows].T @ m_j).astype(np.float64)
+    sums_j = (m_i.T @ x[:, cols]).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = (x[:, rows].T @ x[:, cols]).astype(np.float64) - sums_i * sums_j / n
+        variance_i = (squares[:, rows].T @ m_j).astype(np.float64) - sums_i * sums_i / n
+        variance_j = (m_i.T @ squares[:, cols]).astype(np.float64) - sums_j * sums_j / n
+        corr = covariance / np.sqrt(variance_i * variance_j)
+    corr[(n < 2) | ~np.isfinite(corr)] = np.nan
+    return np.clip(corr, -1, 1)
+
+def _top_pairs(block_corr, columns, k, block):
+    # block_corr(rows, cols) gives one block of the correlation matrix (NaN where
+    # a pair has no correlation); only the running top-k is kept. Also returns
+    # which columns have at least one defined pair.
+    n_columns = len(columns)
+    best_values = np.empty(0, dtype=np.float64)
+    best_rows = np.empty(0, dtype=np.int64)
+    best_cols = np.empty(0, dtype=np.int64)
+    defined = np.zeros(n_columns, dtype=bool)
+
+    for start_i in range(0, n_columns, block):
+        rows_i = slice(start_i, start_i + block)
+        for start_j in range(start_i, n_columns, block):
+            cols_j = slice(start_j, start_j + block)
+            corr = block_corr(rows_i, cols_j)
+            scores = np.where(np.isnan(corr), -1, np.abs(corr))
+            if start_j == start_i:
+                # Only the strict upper triangle of diagonal blocks holds distinct pairs
+                scores[np.tril_indices(scores.shape[0], m=scores.shape[1])] = -1
+            valid = scores >= 0
+            defined[rows_i] |= valid.any(axis=1)
+            defined[cols_j] |= valid.any(axis=0)
+            flat = scores.ravel()
+            candidates = np.argpartition(flat, -k)[-k:] if flat.size > k else np.arange(flat.size)
+            candidates = candidates[flat[candidates] >= 0]
+            rows, cols = np.unravel_index(candidates, scores.shape)
+            best_values = np.concatenate([best_values, corr[rows, cols]])
+            best_rows = np.concatenate([best_rows, rows + start_i])
+            best_cols = np.concatenate([best_cols, cols + start_j])
+
+        # Keep only the global top-k between row blocks to bound memory
+        keep = np.argsort(-np.abs(best_values), kind='stable')[:k]
+        best_values, best_rows, best_cols = best_values[keep], best_rows[keep], best_cols[keep]
+
+    pairs = pd.DataFrame({
+        'column_a': columns[best_rows],
+        'column_b': columns[best_cols],
+        'correlation': best_values.astype(float),
+    })
+    return pairs, defined
+
+def top_correlated_pairs(z, columns, k=TOP_CORRELATION_PAIRS, block=CORRELATION_BLOCK_COLUMNS):
+    # float32 dot products can land a hair outside [-1, 1]
+    return _top_pairs(lambda rows, cols: np.clip(z[:, rows].T @ z[:, cols], -1, 1), columns, k, block)[0]
+
+def _heatmap_columns(columns, pairs, max_columns):
+    # Prefer columns involved in the strongest pairs, then fill up in column order
+    selected = list(dict.fromkeys(list(pairs['column_a']) + list(pairs['column_b'])))[:max_columns]
+    for col in columns:
+        if len(selected) >= max_columns:
+            break
+        if col not in selected:
+            selected.append(col)
+    return selected
+
+def clustered_heatmap(z, columns, pairs, max_columns=HEATMAP_MAX_COLUMNS):
+    selected = _heatmap_columns(columns, pairs, max_columns)
+    positions = columns.get_indexer(selected)
+    corr = np.clip(z[:, positions].T @ z[:, positions], -1, 1)
+    return _cluster(corr, selected)
+
+def _cluster(corr, selected):
+    np.fill_diagonal(corr, 1)
+    if len(selected) > 2:
+        distance = np.clip(1 - np.abs(corr), 0, None)
+        np.fill_diagonal(distance, 0)
+        order = hierarchy.leaves_list(hierarchy.linkage(spatial_distance.squareform(distance, checks=False), method='average'))
+        selected = [selected[i] for i in order]
+        corr = corr[np.ix_(order, order)]
+    return pd.DataFrame(corr.astype(float), index=selected, columns=selected)
+
+def pairwise_correlation_summary(numeric_df, method='pearson', k=TOP_CORRELATION_PAIRS, block=CORRELATION_BLOCK_COLUMNS):
+    # Same blocked top-k and heatmap reduction as correlation_summary, on
+    # pairwise-complete correlations
+    x, squares, mask = pairwise_standardized(numeric_df, method)
+    block_corr = lambda rows, cols: pairwise_correlation_block(x, squares, mask, rows, cols)
+    pairs, defined = _top_pairs(block_corr, numeric_df.columns, k, block)
+    columns = numeric_df.columns[defined]
+    selected = _heatmap_columns(columns, pairs, HEATMAP_MAX_COLUMNS)
+    positions = numeric_df.columns.get_indexer(selected)
+    return {
+        "method": method,
+        "pairs": pairs,
+        "heatmap": _cluster(np.nan_to_num(block_corr(positions, positions)), selected),
+        "columns_used": len(columns),
+        "constant_columns": list(numeric_df.columns[~defined]),
+    }
+
+def correlation_summary(numeric_df, method='pearson', k=TOP_CORRELATION_PAIRS):
+    if numeric_df.isna().to_numpy().any():
+        # Imputing the gaps would pull every correlation towards 0
+        return pairwise_correlation_summary(numeric_df, method, k)
+    z, columns, constant_columns = standardized_matrix(numeric_df, method)
+    pairs = top_correlated_pairs(z, columns, k)
+    return {
+        "method": method,
+        "pairs": pairs,
+        "heatmap": clustered_heatmap(z, columns, pairs),
+        "columns_used": len(columns),
+        "constant_columns": list(constant_columns),
+    }
+
+def matrix_correlation_summary(matrix, columns, method='pearson', k=TOP_CORRELATION_PAIRS):
+    # Same result as correlation_summary, for a correlation matrix an engine
+    # already computed (NaN where a pair has no variance)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    columns = pd.Index(columns)
+    off_diagonal = ~np.eye(len(columns), dtype=bool)
+    varying = (~np.isnan(matrix) & off_diagonal).any(axis=1) if len(columns) > 1 else np.zeros(len(columns), dtype=bool)
+    matrix, constant_columns, columns = matrix[np.ix_(varying, varying)], columns[~varying], columns[varying]
+
+    rows, cols = np.triu_indices(len(columns), k=1)
+    values = matrix[rows, cols]
+    order = np.argsort(-np.where(np.isnan(values), -1, np.abs(values)), kind='stable')[:k]
+    order = order[~np.isnan(values[order])]
+    pairs = pd.DataFrame({
+        'column_a': columns[rows[order]],
+        'column_b': columns[cols[order]],
+        'correlation': values[order].astype(float),
+    })
+    selected = _heatmap_columns(columns, pairs, HEATMAP_MAX_COLUMNS)
+    positions = columns.get_indexer(selected)
+    return {
+        "method": method,
+        "pairs": pairs,
+        "heatmap": _cluster(np.nan_to_num(matrix[np.ix_(positions, positions)]), selected),
+        "columns_used": len(columns),
+        "constant_columns": list(constant_columns),
+    }
\ No newline at end of file
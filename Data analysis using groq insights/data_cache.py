@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import hashlib
+from data_utils import profile_dataframe
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+CACHE_DIR = os.environ.get("EDA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "eda_app"))
+CACHE_MAX_BYTES = int(os.environ.get("EDA_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+# Bump when load_data/preprocess_column change so stale entries are not reused
+CACHE_FORMAT_VERSION = "2"
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# Content hashes of uploads already seen in this process, keyed by upload id
+_upload_hashes = {}
+
+def cache_available():
+    return pa is not None
+
+def file_content_hash(uploaded_file, variant=None):
+    # variant covers load options that change the result, e.g. the selected sheets.
+    # An upload keeps its file_id across reruns, so it is only read once
+    upload_id = getattr(uploaded_file, 'file_id', None)
+    memo_key = (upload_id, uploaded_file.size, repr(variant)) if upload_id else None
+    if memo_key in _upload_hashes:
+        return _upload_hashes[memo_key]
+    digest = hashlib.sha256(CACHE_FORMAT_VERSION.encode())
+    if variant is not None:
+        digest.update(repr(variant).encode())
+    uploaded_file.seek(0)
+    while True:
+        block = uploaded_file.read(HASH_BLOCK_BYTES)
+        if not block:
+            break
+        digest.update(block)
+    uploaded_file.seek(0)
+    if memo_key is not None:
+        _upload_hashes[memo_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.arrow")
+
+def load_cached_dataset(key):
+    if not cache_available():
+        return None
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        # Numeric columns stay views of the memory map instead of being copied out;
+        # they are read-only, so stages must not write into the loaded frame in place
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        del table
+    except (OSError, pa.ArrowInvalid):
+        return None
+    # Touch the entry so eviction treats it as recently used
+    os.utime(path, None)
+    return df
+
+def store_cached_dataset(key, df, source_name=None):
+    if not cache_available():
+        return False
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        return False
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"eda_source_name"] = (source_name or "").encode()
+    metadata[b"eda_inferred_types"] = json.dumps({str(col): data_type for col, data_type in profile_dataframe(df)["dtype_class"].items()}).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write to a temporary name first so readers never see a half-written entry
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    evict_cache()
+    return True
+
+def cache_entries():
+    if not cache_available() or not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".arrow"):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        stat = os.stat(path)
+        entry = {
+            "key": name[:-len(".arrow")],
+            "size_bytes": stat.st_size,
+            "last_used": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stat.st_mtime)),
+            "last_used_ts": stat.st_mtime,
+        }
+        try:
+            with pa.memory_map(path, 'r') as source:
+                schema = pa.ipc.open_file(source).schema
+            metadata = schema.metadata or {}
+            entry["source_name"] = metadata.get(b"eda_source_name", b"").decode()
+            entry["inferred_types"] = json.loads(metadata.get(b"eda_inferred_types", b"{}"))
+        except (OSError, pa.ArrowInvalid):
+            entry["source_name"] = ""
+            entry["inferred_types"] = {}
+        entries.append(entry)
+    return sorted(entries, key=lambda e: e["last_used_ts"], reverse=True)
+
+def evict_cache(max_bytes=CACHE_MAX_BYTES):
+    # Least recently used entries go first until the cache fits the budget
+    entries = cache_entries()
+    total = sum(e["size_bytes"] for e in entries)
+    removed = []
+    for entry in reversed(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(_entry_path(entry["key"]))
+        except FileNotFoundError:
+            pass
+        total -= entry["size_bytes"]
+        removed.append(entry["key"])
+    return removed
+
+def clear_cache():
+    removed = 0
+    for entry in cache_entries():
+        try:
+            os.remove(_entry_path(entry["key"]))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
\ No newline at end of file
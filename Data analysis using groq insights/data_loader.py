@@ -1,33 +1,297 @@
+import io
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import streamlit as st
-from data_utils import infer_data_type, preprocess_column, check_and_preprocess
+from pandas.api.types import union_categoricals, is_datetime64_any_dtype
+from lazy_imports import lazy_import
+from data_utils import infer_data_type, preprocess_column, check_and_preprocess, downcast_numeric, profile_dataframe
+from compute_backend import COMPUTE_BACKEND, choose_backend, open_frame, is_out_of_core
 
-def load_data(uploaded_file):
+# CSV uploads above this size are read in chunks instead of in one go
+STREAMING_THRESHOLD_BYTES = 200 * 1024 * 1024
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 10_000
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Only the fallback reader/writer; it is imported when first used
+openpyxl = lazy_import("openpyxl", optional=True)
+
+class DatasetError(ValueError):
+    # The file or sheet selection leaves nothing to analyse
+    pass
+
+# Workbook bytes shared with sheet-parsing worker processes
+_worker_workbook = None
+
+def infer_column_types(sample):
+    return {col: infer_data_type(preprocess_column(sample[col])) for col in sample.columns}
+
+def apply_column_types(chunk, column_types, coerced=None):
+    # coerced, if given, counts per column the values that did not fit the
+    # inferred type and became missing
+    for col, data_type in column_types.items():
+        if data_type in ('numeric', 'datetime'):
+            present = chunk[col].notna()
+            if data_type == 'numeric':
+                chunk[col] = downcast_numeric(pd.to_numeric(chunk[col], errors='coerce'))
+            else:
+                chunk[col] = pd.to_datetime(chunk[col], errors='coerce')
+            if coerced is not None:
+                lost = int((present & chunk[col].isna()).sum())
+                if lost:
+                    coerced[col] = coerced.get(col, 0) + lost
+        elif data_type == 'categorical':
+            chunk[col] = chunk[col].astype('category')
+        else:
+            chunk[col] = chunk[col].astype('string')
+    return chunk
+
+def combine_column_parts(parts, data_type):
+    if data_type == 'categorical':
+        return pd.Series(union_categoricals(parts), name=parts[0].name)
+    return pd.concat(parts, ignore_index=True)
+
+def read_csv_in_chunks(uploaded_file, chunksize=CHUNK_ROWS, sample_rows=SAMPLE_ROWS, progress=None):
+    # Infer the column types once on a sample, then apply them to every chunk
+    sample = pd.read_csv(uploaded_file, nrows=sample_rows, low_memory=False)
+    column_types = infer_column_types(sample)
+    uploaded_file.seek(0)
+
+    # Non-numeric columns are read as plain strings so every chunk yields the same categories
+    read_dtypes = {col: 'object' for col, data_type in column_types.items() if data_type != 'numeric'}
+    total_bytes = getattr(uploaded_file, 'size', None)
+
+    def report(rows_read):
+        if progress is None:
+            return
+        if total_bytes:
+            fraction = min(uploaded_file.tell() / total_bytes, 1.0)
+            progress(fraction, f"Read {rows_read:,} rows ({fraction:.0%})")
+        else:
+            progress(0.0, f"Read {rows_read:,} rows")
+
+    with pd.read_csv(uploaded_file, chunksize=chunksize, dtype=read_dtypes, low_memory=False) as reader:
+        df = collect_typed_chunks(reader, column_types, report)
+    if progress is not None:
+        progress(1.0, f"Read {len(df):,} rows")
+    return df
+
+def collect_typed_chunks(chunks, column_types, report=None):
+    # Keep typed parts per column so each raw chunk can be released straight away.
+    # Types come from a sample, so later values that do not fit are counted in
+    # df.attrs["coerced_values"] for read_dataset to report
+    parts = {col: [] for col in column_types}
+    coerced = {}
+    rows_read = 0
+    for chunk in chunks:
+        chunk = apply_column_types(chunk, column_types, coerced)
+        for col in column_types:
+            parts[col].append(chunk[col])
+        rows_read += len(chunk)
+        del chunk
+        if report is not None:
+            report(rows_read)
+
+    columns = {}
+    for col, data_type in column_types.items():
+        columns[col] = combine_column_parts(parts.pop(col), data_type)
+    df = pd.DataFrame(columns)
+    df.attrs["coerced_values"] = coerced
+    return df
+
+def _coercion_warnings(df, sheet=None):
+    where = f" in sheet '{sheet}'" if sheet is not None else ""
+    warnings = []
+    for col, count in df.attrs.pop("coerced_values", {}).items():
+        kind = 'date' if is_datetime64_any_dtype(df[col]) else 'numeric'
+        warnings.append(f"Column '{col}'{where}: {count:,} values did not match the inferred {kind} type and were set to missing.")
+    return warnings
+
+def list_excel_sheets(uploaded_file):
+    # Only the workbook index is read, none of the sheet data
+    uploaded_file.seek(0)
     try:
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file, low_memory=False)
+        if CalamineWorkbook is not None:
+            return CalamineWorkbook.from_filelike(uploaded_file).sheet_names
+        workbook = openpyxl.load_workbook(uploaded_file, read_only=True)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+    finally:
+        uploaded_file.seek(0)
+
+def _excel_rows(content, sheet):
+    # Rows as plain Python values; calamine is a native reader, openpyxl the fallback
+    if CalamineWorkbook is not None:
+        yield from CalamineWorkbook.from_filelike(io.BytesIO(content)).get_sheet_by_name(sheet).iter_rows()
+        return
+    workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        yield from workbook[sheet].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _header_names(row):
+    names, seen = [], {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or value == '' else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
         else:
-            df = pd.read_excel(uploaded_file)
-        
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _excel_chunks(rows, columns, chunksize):
+    width = len(columns)
+    while True:
+        block = [list(row[:width]) + [None] * (width - len(row)) for row in itertools.islice(rows, chunksize)]
+        if not block:
+            return
+        chunk = pd.DataFrame(block, columns=columns, dtype=object)
+        # calamine reports empty cells as empty strings
+        yield chunk.mask(chunk == '')
+
+def read_excel_sheet(content, sheet, chunksize=CHUNK_ROWS, sample_rows=SAMPLE_ROWS, report=None):
+    # Same typed pipeline as chunked CSV reads: types come from a sample of the
+    # first chunk and are applied chunk by chunk
+    rows = _excel_rows(content, sheet)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    columns = _header_names(header)
+    chunks = _excel_chunks(rows, columns, chunksize)
+    first = next(chunks, None)
+    if first is None:
+        return pd.DataFrame(columns=columns)
+    column_types = infer_column_types(first.head(sample_rows).infer_objects())
+    return collect_typed_chunks(itertools.chain([first], chunks), column_types, report)
+
+def _init_excel_worker(content):
+    global _worker_workbook
+    _worker_workbook = content
+
+def _read_sheet_in_worker(sheet):
+    return read_excel_sheet(_worker_workbook, sheet)
+
+def read_excel_sheets(uploaded_file, sheets, progress=None):
+    content = uploaded_file.getvalue()
+    progress = progress or (lambda fraction, text: None)
+    if len(sheets) == 1:
+        report = lambda rows_read: progress(0.0, f"Read {rows_read:,} rows from '{sheets[0]}'")
+        frames = {sheets[0]: read_excel_sheet(content, sheets[0], report=report)}
+    else:
+        # One worker process per sheet; the workbook bytes are sent once per worker
+        frames = {}
+        workers = min(len(sheets), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_excel_worker, initargs=(content,)) as executor:
+            futures = {executor.submit(_read_sheet_in_worker, sheet): sheet for sheet in sheets}
+            for done, future in enumerate(as_completed(futures), start=1):
+                frames[futures[future]] = future.result()
+                progress(done / len(sheets), f"Parsed {done} of {len(sheets)} sheets")
+    progress(1.0, f"Read {sum(len(frame) for frame in frames.values()):,} rows")
+    return [frames[sheet] for sheet in sheets]
+
+def read_dataset(uploaded_file, chunksize=None, sheets=None, progress=None, backend=COMPUTE_BACKEND):
+    # Headless loader: returns (df, warnings) and raises DatasetError for unusable
+    # files; progress is an optional callback taking (fraction, text). With an
+    # out-of-core backend df is a compute_backend frame over the file on disk.
+    warnings = []
+    streamed = False
+    engine = choose_backend(uploaded_file, backend)
+    if engine != "pandas":
+        if progress is not None:
+            progress(0.0, f"Converting the file to a columnar copy for {engine}...")
+        df = open_frame(uploaded_file, engine)
+        if progress is not None:
+            progress(1.0, f"Querying {len(df):,} rows with {engine}")
         if df.empty:
-            st.error("The uploaded file is empty. Please upload a file with data.")
-            return None
-        elif len(df.columns) == 0:
-            st.error("No columns found in the uploaded file. Please check the file format.")
-            return None
+            raise DatasetError("The uploaded file is empty. Please upload a file with data.")
+        return df, warnings
+    if backend not in ("auto", "pandas") and uploaded_file.name.endswith('.csv'):
+        warnings.append(f"The {backend} backend is not installed; the file is loaded with pandas.")
+
+    if uploaded_file.name.endswith('.csv'):
+        if chunksize is None and getattr(uploaded_file, 'size', 0) > STREAMING_THRESHOLD_BYTES:
+            chunksize = CHUNK_ROWS
+        if chunksize:
+            df = read_csv_in_chunks(uploaded_file, chunksize, progress=progress)
+            warnings += _coercion_warnings(df)
+            streamed = True
         else:
-            # Convert problematic columns to appropriate types
-            for col in df.columns:
-                try:
-                    df[col] = preprocess_column(df[col])
-                except Exception as e:
-                    st.warning(f"Could not preprocess column '{col}': {str(e)}")
-            
-            st.success("File successfully uploaded and read!")
-            return df
+            df = pd.read_csv(uploaded_file, low_memory=False)
+    else:
+        if sheets is None:
+            sheets = list_excel_sheets(uploaded_file)[:1]
+        if not sheets:
+            raise DatasetError("Select at least one sheet to load.")
+        frames = read_excel_sheets(uploaded_file, sheets, progress)
+        for sheet, frame in zip(sheets, frames):
+            warnings += _coercion_warnings(frame, sheet if len(sheets) > 1 else None)
+        if len(frames) == 1:
+            df = frames[0]
+        else:
+            df = pd.concat(frames, keys=sheets, names=['sheet']).reset_index(level='sheet').reset_index(drop=True)
+        streamed = True
+
+    if df.empty:
+        raise DatasetError("The uploaded file is empty. Please upload a file with data.")
+    if len(df.columns) == 0:
+        raise DatasetError("No columns found in the uploaded file. Please check the file format.")
+
+    # Convert problematic columns to appropriate types
+    # (chunked reads are already typed and downcast)
+    if not streamed:
+        for col in df.columns:
+            try:
+                df[col] = preprocess_column(df[col])
+            except Exception as e:
+                warnings.append(f"Could not preprocess column '{col}': {str(e)}")
+    return df, warnings
+
+def _progress_bar(text):
+    # The bar is only created once a reader actually reports progress
+    bar = []
+    def update(fraction, message):
+        if not bar:
+            bar.append(st.progress(0.0, text=text))
+        bar[0].progress(fraction, text=message)
+    return update
+
+def load_data(uploaded_file, chunksize=None, sheets=None, backend=COMPUTE_BACKEND):
+    try:
+        df, warnings = read_dataset(uploaded_file, chunksize, sheets, _progress_bar("Reading file..."), backend)
+    except DatasetError as e:
+        st.error(str(e))
+        return None
     except Exception as e:
         st.error(f"An error occurred while loading the file: {str(e)}")
         return None
+    for warning in warnings:
+        st.warning(warning)
+    st.success("File successfully uploaded and read!")
+    if is_out_of_core(df):
+        st.info(f"The data stays on disk and is queried with {df.engine}; statistics are computed by the engine.")
+    return df
+
+def column_overview(df, profile=None):
+    profile = profile if profile is not None else profile_dataframe(df)
+    return pd.DataFrame({
+        'Column Name': df.columns,
+        'Data Type': df.dtypes,
+        'Inferred Type': profile['dtype_class'],
+        'Non-Null Count': profile['non_null_count'],
+        'Null Count': profile['null_count'],
+        'Unique Values': profile['nunique']
+    })
 
 def display_data_overview(df):
     st.subheader("Dataset Overview")
@@ -35,34 +299,28 @@ def display_data_overview(df):
     st.write(f"Number of columns: {df.shape[1]}")
 
     st.subheader("Column Information")
-    col_info = pd.DataFrame({
-        'Column Name': df.columns,
-        'Data Type': df.dtypes,
-        'Inferred Type': df.apply(infer_data_type),
-        'Non-Null Count': df.notnull().sum(),
-        'Null Count': df.isnull().sum(),
-        'Unique Values': df.nunique()
-    })
-    st.write(col_info)
+    profile = profile_dataframe(df)
+    st.write(column_overview(df, profile))
     
     st.subheader("First Few Rows of the Dataset")
     st.write(df.head())
 
     # Add data quality checks
     st.subheader("Data Quality Checks")
-    for col in df.columns:
-        data_type = infer_data_type(df[col])
+    for col, stats in profile.iterrows():
+        data_type = stats['dtype_class']
         if data_type == 'numeric':
-            if df[col].isnull().sum() > 0:
-                st.warning(f"Column '{col}' contains {df[col].isnull().sum()} null values.")
-            if df[col].min() < 0 and df[col].max() > 0:
+            if stats['null_count'] > 0:
+                st.warning(f"Column '{col}' contains {stats['null_count']} null values.")
+            if stats['min'] < 0 and stats['max'] > 0:
                 st.info(f"Column '{col}' contains both positive and negative values.")
         elif data_type == 'datetime':
-            if df[col].isnull().sum() > 0:
-                st.warning(f"Column '{col}' contains {df[col].isnull().sum()} null values.")
-            st.info(f"Date range for '{col}': {df[col].min()} to {df[col].max()}")
+            if stats['null_count'] > 0:
+                st.warning(f"Column '{col}' contains {stats['null_count']} null values.")
+            st.info(f"Date range for '{col}': {stats['min']} to {stats['max']}")
         elif data_type in ['categorical', 'text']:
-            if df[col].isnull().sum() > 0:
-                st.warning(f"Column '{col}' contains {df[col].isnull().sum()} null values.")
-            if df[col].nunique() == 1:
-                st.warning(f"Column '{col}' has only one unique value: {df[col].unique()[0]}")
\ No newline at end of file
+            if stats['null_count'] > 0:
+                st.warning(f"Column '{col}' contains {stats['null_count']} null values.")
+            if stats['nunique'] == 1:
+                value = df.category_counts(col, 1)['category'].iloc[0] if is_out_of_core(df) else df[col].dropna().iloc[0]
+                st.warning(f"Column '{col}' has only one unique value: {value}")
\ No newline at end of file
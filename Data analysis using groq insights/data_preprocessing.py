@@ -1,68 +1,94 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.impute import SimpleImputer
-from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype, is_categorical_dtype, is_object_dtype
+from data_utils import infer_data_type, preprocess_column, profile_dataframe, column_type, invalidate_profile
+from sketches import SKETCH_ROW_THRESHOLD, sketch_frame
+from compute_backend import is_out_of_core, numeric_columns as numeric_column_names
 
-def infer_data_type(series):
-    if is_numeric_dtype(series):
-        return 'numeric'
-    elif is_datetime64_any_dtype(series):
-        return 'datetime'
-    elif is_categorical_dtype(series) or (is_object_dtype(series) and series.nunique() / len(series) < 0.5):
-        return 'categorical'
-    else:
-        return 'text'
+FILL_STRATEGIES = {
+    "Fill missing data with mean/mode": 'mean',
+    "Fill missing data with median": 'median',
+}
 
-def preprocess_column(series):
-    data_type = infer_data_type(series)
-    if data_type == 'numeric':
-        return pd.to_numeric(series, errors='coerce')
-    elif data_type == 'datetime':
-        return pd.to_datetime(series, errors='coerce')
-    elif data_type == 'categorical':
-        return series.astype('category')
-    else:
-        return series.astype('string')
+def handle_missing_data(df, strategy, null_mask=None):
+    # A single null mask drives the report, row removal and filling; only
+    # columns that actually have gaps are touched
+    if is_out_of_core(df):
+        return _handle_missing_out_of_core(df, strategy)
+    column_types = profile_dataframe(df)['dtype_class']
+    if null_mask is None:
+        null_mask = df.isna()
+    has_missing = null_mask.any()
+    numeric_columns = [col for col in df.columns if column_types[col] == 'numeric' and has_missing[col]]
+    label_columns = [col for col in df.columns if column_types[col] in ['categorical', 'text'] and has_missing[col]]
 
-def handle_missing_data(df, strategy):
-    for column in df.columns:
-        data_type = infer_data_type(df[column])
-        if data_type == 'numeric':
-            if strategy == "Remove rows with missing data":
-                df = df.dropna(subset=[column])
-            elif strategy in ["Fill missing data with mean/mode", "Fill missing data with median"]:
-                imputer = SimpleImputer(strategy='mean' if strategy == "Fill missing data with mean/mode" else 'median')
-                df[column] = imputer.fit_transform(df[[column]])
-        elif data_type in ['categorical', 'text']:
-            if strategy == "Remove rows with missing data":
-                df = df.dropna(subset=[column])
-            elif strategy in ["Fill missing data with mean/mode", "Fill missing data with median"]:
-                imputer = SimpleImputer(strategy='most_frequent')
-                df[column] = imputer.fit_transform(df[[column]])
+    if strategy == "Remove rows with missing data":
+        df = df[~null_mask[numeric_columns + label_columns].to_numpy().any(axis=1)]
+    elif strategy in FILL_STRATEGIES:
+        if numeric_columns:
+            numeric = df[numeric_columns]
+            fills = numeric.mean() if FILL_STRATEGIES[strategy] == 'mean' else numeric.median()
+            values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            np.copyto(values, fills.to_numpy(dtype=np.float64), where=null_mask[numeric_columns].to_numpy())
+            df[numeric_columns] = values
+        if label_columns:
+            modes = df[label_columns].mode()
+            if len(modes):
+                df[label_columns] = df[label_columns].fillna(modes.iloc[0])
     
-    st.success(f"Missing data handled using strategy: {strategy}")
+    invalidate_profile(df)
     return df
 
-def handle_outliers(df, column, strategy):
-    if infer_data_type(df[column]) != 'numeric':
-        st.warning(f"Outlier detection skipped for non-numeric column: {column}")
+def _handle_missing_out_of_core(df, strategy):
+    # Same choices, recorded as steps the engine applies in every later query
+    profile = profile_dataframe(df)
+    has_missing = profile['null_count'] > 0
+    numeric_columns = [col for col in df.columns if profile.at[col, 'dtype_class'] == 'numeric' and has_missing[col]]
+    label_columns = [col for col in df.columns if profile.at[col, 'dtype_class'] in ['categorical', 'text'] and has_missing[col]]
+
+    if strategy == "Remove rows with missing data":
+        return df.drop_nulls(numeric_columns + label_columns)
+    if strategy in FILL_STRATEGIES:
+        fills = df.fill_values(numeric_columns, FILL_STRATEGIES[strategy])
+        fills.update(df.fill_values(label_columns, 'mode'))
+        return df.fill_nulls(fills)
+    return df
+
+def outlier_sketches(df, numeric_columns):
+    # Quartiles for every numeric column in one pass on very long or out-of-core frames
+    if is_out_of_core(df):
+        return df.sketches(numeric_columns)
+    return sketch_frame(df[numeric_columns]) if len(df) > SKETCH_ROW_THRESHOLD else None
+
+def outlier_bounds(df, column, sketches=None):
+    if sketches is None and is_out_of_core(df):
+        sketches = df.sketches([column])
+    if sketches is not None and sketches.get(column, {}).get('quantiles') is not None:
+        Q1, Q3 = sketches[column]['quantiles'].quantiles([0.25, 0.75])
+    else:
+        Q1, Q3 = df[column].quantile([0.25, 0.75])
+    IQR = Q3 - Q1
+    return Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+
+def handle_outliers(df, column, strategy, bounds=None):
+    # Non-numeric columns are returned unchanged
+    if column_type(df, column) != 'numeric':
         return df
     
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
+    lower_bound, upper_bound = bounds if bounds is not None else outlier_bounds(df, column)
+    
+    if is_out_of_core(df):
+        if strategy == "Remove outliers":
+            return df.between(column, lower_bound, upper_bound)
+        if strategy == "Cap outliers":
+            return df.clip(column, lower_bound, upper_bound)
+        return df
     
     if strategy == "Remove outliers":
         df = df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
-        st.success(f"Outliers removed from '{column}'.")
     elif strategy == "Cap outliers":
         df[column] = df[column].clip(lower_bound, upper_bound)
-        st.success(f"Outliers capped in '{column}'.")
-    else:
-        st.info(f"Outliers kept in '{column}'.")
+        invalidate_profile(df)
     return df
 
 def preprocess_data(df):
@@ -70,7 +96,8 @@ def preprocess_data(df):
     
     # Handling missing data
     st.subheader("Handling Missing Data")
-    missing_data = df.isnull().sum()
+    null_mask = None if is_out_of_core(df) else df.isna()
+    missing_data = profile_dataframe(df)['null_count'] if null_mask is None else null_mask.sum()
     st.write("Missing values in each column:")
     st.write(missing_data)
     
@@ -79,22 +106,26 @@ def preprocess_data(df):
         ("Keep missing data", "Remove rows with missing data", "Fill missing data with mean/mode", "Fill missing data with median")
     )
     
-    df = handle_missing_data(df, missing_strategy)
+    df = handle_missing_data(df, missing_strategy, null_mask)
+    st.success(f"Missing data handled using strategy: {missing_strategy}")
     
     # Handling outliers
     st.subheader("Outlier Detection and Handling")
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    numeric_columns = numeric_column_names(df)
+    sketches = outlier_sketches(df, numeric_columns)
     
     for column in numeric_columns:
-        Q1 = df[column].quantile(0.25)
-        Q3 = df[column].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
+        lower_bound, upper_bound = outlier_bounds(df, column, sketches)
+        if is_out_of_core(df):
+            outlier_count, outliers = df.outside(column, lower_bound, upper_bound)
+        else:
+            outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
+            outlier_count = len(outliers)
         
         if not outliers.empty:
             st.write(f"Outliers detected in column '{column}':")
+            if outlier_count > len(outliers):
+                st.caption(f"Showing the first {len(outliers):,} of {outlier_count:,} outlier rows.")
             st.write(outliers)
             
             outlier_strategy = st.selectbox(
@@ -102,6 +133,12 @@ def preprocess_data(df):
                 ("Keep outliers", "Remove outliers", "Cap outliers")
             )
             
-            df = handle_outliers(df, column, outlier_strategy)
+            df = handle_outliers(df, column, outlier_strategy, (lower_bound, upper_bound))
+            if outlier_strategy == "Remove outliers":
+                st.success(f"Outliers removed from '{column}'.")
+            elif outlier_strategy == "Cap outliers":
+                st.success(f"Outliers capped in '{column}'.")
+            else:
+                st.info(f"Outliers kept in '{column}'.")
     
     return df
\ No newline at end of file
@@ -1,16 +1,99 @@
+import weakref
+import numpy as np
 import pandas as pd
-from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype, is_categorical_dtype, is_object_dtype
+from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype, is_categorical_dtype, is_object_dtype, is_integer_dtype, is_bool_dtype
+from sketches import SKETCH_ROW_THRESHOLD, sketch_frame
 
-def infer_data_type(series):
+try:
+    import pyarrow
+    TEXT_DTYPE = 'string[pyarrow]'
+except ImportError:
+    TEXT_DTYPE = 'string'
+
+# float(np.iinfo(np.int64).max) rounds up to 2**63, so the upper check is strict
+INT64_MIN, INT64_MAX = float(np.iinfo(np.int64).min), float(np.iinfo(np.int64).max)
+
+# Same cut-off infer_data_type uses to tell categorical from free text
+CATEGORY_RATIO = 0.5
+
+# Column profiles keyed by id(df); entries are dropped when the frame is garbage collected
+_profile_cache = {}
+# Coerced columns keyed the same way, so repeated validations convert each column once
+_conversion_cache = {}
+
+def infer_data_type(series, nunique=None):
     if is_numeric_dtype(series):
         return 'numeric'
     elif is_datetime64_any_dtype(series):
         return 'datetime'
-    elif is_categorical_dtype(series) or (is_object_dtype(series) and series.nunique() / len(series) < 0.5):
+    elif is_categorical_dtype(series):
         return 'categorical'
+    elif is_object_dtype(series) and len(series) > 0:
+        if nunique is None:
+            nunique = series.nunique()
+        return 'categorical' if nunique / len(series) < 0.5 else 'text'
     else:
         return 'text'
 
+def _frame_fingerprint(df):
+    return (df.shape, tuple(df.columns), tuple(str(dtype) for dtype in df.dtypes))
+
+def _build_profile(df):
+    row_count = len(df)
+    null_count = df.isna().sum()
+    if row_count > SKETCH_ROW_THRESHOLD:
+        # Approximate distinct counts keep very long frames to a single streaming pass
+        sketches = sketch_frame(df)
+        nunique = pd.Series({col: sketches[col]['distinct'].count() for col in df.columns})
+    else:
+        nunique = df.nunique()
+    dtype_class = pd.Series({col: infer_data_type(df[col], nunique[col]) for col in df.columns}, dtype=object)
+
+    ordered_columns = [col for col in df.columns if dtype_class[col] in ('numeric', 'datetime')]
+    minimum = df[ordered_columns].min() if ordered_columns else pd.Series(dtype=object)
+    maximum = df[ordered_columns].max() if ordered_columns else pd.Series(dtype=object)
+
+    profile = pd.DataFrame({
+        'dtype_class': dtype_class,
+        'null_count': null_count,
+        'non_null_count': row_count - null_count,
+        'nunique': nunique,
+        'min': minimum.reindex(df.columns),
+        'max': maximum.reindex(df.columns),
+        'cardinality_ratio': nunique / row_count if row_count else 0.0,
+    }, index=df.columns)
+    return profile
+
+def profile_dataframe(df):
+    if not isinstance(df, pd.DataFrame):
+        # Out-of-core frames (compute_backend) profile themselves in the engine
+        return df.profile()
+    key = id(df)
+    fingerprint = _frame_fingerprint(df)
+    cached = _profile_cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    profile = _build_profile(df)
+    if cached is None:
+        weakref.finalize(df, _profile_cache.pop, key, None)
+    _profile_cache[key] = (fingerprint, profile)
+    return profile
+
+def invalidate_profile(df):
+    # Needed after in-place value changes that keep the shape and dtypes
+    cached = _profile_cache.get(id(df))
+    if cached is not None:
+        _profile_cache[id(df)] = (None, cached[1])
+    _conversion_cache.pop(id(df), None)
+
+def column_type(df, column):
+    return profile_dataframe(df).at[column, 'dtype_class']
+
+def columns_of_type(df, *data_types):
+    profile = profile_dataframe(df)
+    return profile.index[profile['dtype_class'].isin(data_types)].tolist()
+
 def preprocess_column(series):
     data_type = infer_data_type(series)
     if data_type == 'numeric':
@@ -19,18 +102,82 @@ def preprocess_column(series):
         return pd.to_datetime(series, errors='coerce')
     elif data_type == 'categorical':
         return series.astype('category')
+    elif isinstance(series.dtype, pd.StringDtype):
+        return series
     else:
         return series.astype('string')
 
+def downcast_numeric(series):
+    if is_bool_dtype(series):
+        return series
+    if is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if (len(values) and np.isfinite(values).all() and (values == np.round(values)).all()
+            and values.min() >= INT64_MIN and values.max() < INT64_MAX):
+        # Whole numbers without gaps fit an integer type, unless they overflow int64
+        return pd.to_numeric(series.astype(np.int64), downcast='integer')
+    # pandas only checks closeness when downcasting floats; keep float64 unless exact
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+def optimize_dtypes(df):
+    # Smallest exact numeric types, categoricals for repetitive text and Arrow-backed
+    # strings for the rest; returns the compacted frame and a per-column memory report
+    before = df.memory_usage(deep=True, index=False)
+    profile = profile_dataframe(df)
+    optimized = {}
+    for col in df.columns:
+        series = df[col]
+        if is_numeric_dtype(series):
+            optimized[col] = downcast_numeric(series)
+        elif not (is_object_dtype(series) or isinstance(series.dtype, pd.StringDtype)):
+            optimized[col] = series
+        elif profile.at[col, 'cardinality_ratio'] < CATEGORY_RATIO:
+            optimized[col] = series.astype('category')
+        else:
+            optimized[col] = series.astype(TEXT_DTYPE)
+    optimized = pd.DataFrame(optimized, index=df.index, copy=False)
+    after = optimized.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame({
+        'dtype_before': df.dtypes.astype(str),
+        'dtype_after': optimized.dtypes.astype(str),
+        'bytes_before': before,
+        'bytes_after': after,
+    })
+    report['saved'] = 1 - report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0)
+    return optimized, report
+
+def _conversions(df):
+    key = id(df)
+    fingerprint = _frame_fingerprint(df)
+    cached = _conversion_cache.get(key)
+    if cached is None or cached[0] != fingerprint:
+        if key not in _conversion_cache:
+            weakref.finalize(df, _conversion_cache.pop, key, None)
+        cached = _conversion_cache[key] = (fingerprint, {})
+    return cached[1]
+
 def check_and_preprocess(df, required_types):
-    preprocessed_df = df.copy()
+    # Returns a frame of just the requested columns; unchanged columns share memory
+    # with df, so the result must be treated as read-only
+    profile = profile_dataframe(df)
+    conversions = _conversions(df)
+    columns = {}
     for col, required_type in required_types.items():
-        if col in preprocessed_df.columns:
-            current_type = infer_data_type(preprocessed_df[col])
-            if current_type != required_type:
-                preprocessed_df[col] = preprocess_column(preprocessed_df[col])
-                if infer_data_type(preprocessed_df[col]) != required_type:
-                    raise ValueError(f"Column '{col}' could not be converted to {required_type}")
-        else:
+        if col not in df.columns:
             raise ValueError(f"Required column '{col}' not found in the dataset")
-    return preprocessed_df
\ No newline at end of file
+        if profile.at[col, 'dtype_class'] == required_type:
+            columns[col] = df[col]
+            continue
+        if col not in conversions:
+            converted = preprocess_column(df[col])
+            conversions[col] = (converted, infer_data_type(converted))
+        converted, converted_type = conversions[col]
+        if converted_type != required_type:
+            raise ValueError(f"Column '{col}' could not be converted to {required_type}")
+        columns[col] = converted
+    return pd.DataFrame(columns, index=df.index, copy=False)
\ No newline at end of file
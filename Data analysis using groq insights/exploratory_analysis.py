@@ -1,62 +1,116 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-from data_utils import infer_data_type, check_and_preprocess
+from lazy_imports import lazy_import
+from data_utils import columns_of_type, check_and_preprocess, profile_dataframe
+from sketches import SKETCH_ROW_THRESHOLD, sketch_frame, sketch_summary
+from pipeline import render_outputs
+from correlation import correlation_summary, matrix_correlation_summary, HEATMAP_ANNOTATE_MAX
+from compute_backend import is_out_of_core
+from chart_data import histogram_summary, histogram_figure, category_counts
+
+px = lazy_import("plotly.express")
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+
+def compute_eda(df, correlation_method='pearson'):
+    outputs = [('header', "3. Exploratory Data Analysis")]
+    # Out-of-core frames are summarised by their engine; nothing is loaded here
+    out_of_core = is_out_of_core(df)
 
-def perform_eda(df):
-    st.header("3. Exploratory Data Analysis")
-    
     # Summary statistics
-    st.subheader("Summary Statistics")
-    st.write(df.describe(include='all'))
-    
+    outputs.append(('subheader', "Summary Statistics"))
+    if out_of_core or len(df) > SKETCH_ROW_THRESHOLD:
+        outputs.append(('caption', f"Approximate statistics ({len(df):,} rows, computed by {df.engine})." if out_of_core
+                        else f"Approximate statistics (more than {SKETCH_ROW_THRESHOLD:,} rows)."))
+        outputs.append(('write', sketch_summary(df.sketches() if out_of_core else sketch_frame(df))))
+    else:
+        outputs.append(('write', df.describe(include='all')))
+
     # Correlation matrix
-    st.subheader("Correlation Matrix")
+    outputs.append(('subheader', "Correlation Matrix"))
+    correlation = None
+    numeric_df = None
+    numeric_columns = []
     try:
-        numeric_df = check_and_preprocess(df, {col: 'numeric' for col in df.columns if infer_data_type(df[col]) == 'numeric'})
-        if not numeric_df.empty:
-            corr_matrix = numeric_df.corr()
+        numeric_columns = columns_of_type(df, 'numeric')
+        if not out_of_core:
+            numeric_df = check_and_preprocess(df, {col: 'numeric' for col in numeric_columns})[numeric_columns]
+        if len(numeric_columns) >= 2:
+            # Blocked top-k engine; only a clustered subset of columns is drawn
+            if out_of_core:
+                matrix = df.correlation_matrix(numeric_columns, correlation_method)
+                correlation = matrix_correlation_summary(matrix, numeric_columns, method=correlation_method)
+            else:
+                correlation = correlation_summary(numeric_df, method=correlation_method)
+            heatmap = correlation["heatmap"]
             fig, ax = plt.subplots(figsize=(10, 8))
-            sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=ax)
-            st.pyplot(fig)
+            sns.heatmap(heatmap, annot=len(heatmap) <= HEATMAP_ANNOTATE_MAX, cmap='coolwarm', vmin=-1, vmax=1, ax=ax)
+            plt.close(fig)
+            outputs.append(('pyplot', fig))
+            if len(heatmap) < correlation["columns_used"]:
+                outputs.append(('caption', f"Showing {len(heatmap)} of {correlation['columns_used']} numeric columns, clustered by correlation strength."))
+            outputs.append(('write', f"Strongest {correlation_method.title()} correlations:"))
+            outputs.append(('write', correlation["pairs"]))
+        elif numeric_columns:
+            outputs.append(('warning', "Not enough numeric columns for correlation analysis."))
         else:
-            st.warning("No numeric columns found for correlation analysis.")
+            outputs.append(('warning', "No numeric columns found for correlation analysis."))
     except ValueError as e:
-        st.warning(f"Could not create correlation matrix: {str(e)}")
-    
+        outputs.append(('warning', f"Could not create correlation matrix: {str(e)}"))
+
     # Distribution plots
-    st.subheader("Distribution Plots")
+    outputs.append(('subheader', "Distribution Plots"))
+    column_types = profile_dataframe(df)['dtype_class']
     for column in df.columns:
-        data_type = infer_data_type(df[column])
+        data_type = column_types[column]
         if data_type == 'numeric':
             try:
-                numeric_col = check_and_preprocess(df, {column: 'numeric'})
-                fig = px.histogram(numeric_col, x=column, marginal="box", title=f"Distribution of {column}")
-                st.plotly_chart(fig)
-                
-                skewness = numeric_col[column].skew()
-                kurtosis = numeric_col[column].kurtosis()
-                st.markdown(f"""
+                if out_of_core:
+                    summary = df.histogram_summary(column)
+                else:
+                    numeric_col = check_and_preprocess(df, {column: 'numeric'})
+                    # Binned server-side; the figure only carries edges, counts and box stats
+                    summary = histogram_summary(numeric_col[column])
+                if summary is None:
+                    outputs.append(('warning', f"No numeric values to plot for {column}."))
+                    continue
+                outputs.append(('figure', histogram_figure(summary, column, f"Distribution of {column}")))
+
+                if out_of_core:
+                    skewness, kurtosis = df.moments(column)
+                else:
+                    skewness = numeric_col[column].skew()
+                    kurtosis = numeric_col[column].kurtosis()
+                outputs.append(('markdown', f"""
                 📊 Distribution insights for {column}:
-                - 📏 Skewness: {skewness:.2f} 
+                - 📏 Skewness: {skewness:.2f}
                 - 📈 Kurtosis: {kurtosis:.2f}
-                """)
+                """))
             except ValueError as e:
-                st.warning(f"Could not create distribution plot for {column}: {str(e)}")
+                outputs.append(('warning', f"Could not create distribution plot for {column}: {str(e)}"))
         elif data_type in ['categorical', 'text']:
             try:
-                cat_col = check_and_preprocess(df, {column: 'categorical'})
-                value_counts = cat_col[column].value_counts().reset_index()
-                value_counts.columns = ['category', 'count']
+                if out_of_core:
+                    value_counts = df.category_counts(column)
+                else:
+                    cat_col = check_and_preprocess(df, {column: 'categorical'})
+                    value_counts = category_counts(cat_col[column])
                 fig = px.bar(value_counts, x='category', y='count', title=f"Distribution of {column}")
-                st.plotly_chart(fig)
+                outputs.append(('figure', fig))
             except ValueError as e:
-                st.warning(f"Could not create distribution plot for {column}: {str(e)}")
-    
+                outputs.append(('warning', f"Could not create distribution plot for {column}: {str(e)}"))
+
     return {
-        "correlation_matrix": corr_matrix.to_dict() if 'corr_matrix' in locals() else None,
-        "numeric_columns": numeric_df.columns.tolist() if 'numeric_df' in locals() else []
-    }
\ No newline at end of file
+        "outputs": outputs,
+        "results": {
+            "correlation_matrix": correlation["heatmap"].to_dict() if correlation is not None else None,
+            "top_correlations": correlation["pairs"].to_dict('records') if correlation is not None else [],
+            "numeric_columns": list(numeric_columns) if out_of_core else (numeric_df.columns.tolist() if numeric_df is not None else [])
+        }
+    }
+
+def perform_eda(df):
+    eda = compute_eda(df)
+    render_outputs(eda["outputs"])
+    return eda["results"]
\ No newline at end of file
@@ -1,31 +1,221 @@
+import os
+import io
+import gzip
+import time
+import tempfile
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
+import numpy as np
+from lazy_imports import lazy_import
+from compute_backend import is_out_of_core, in_memory_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Only the fallback reader/writer; it is imported when first used
+openpyxl = lazy_import("openpyxl", optional=True)
+
+EXPORT_DIR = os.environ.get("EDA_EXPORT_DIR", tempfile.gettempdir())
+EXPORT_CHUNK_ROWS = 100_000
+XLSX_MAX_ROWS = 1_048_575
+DATA_FORMATS = {".csv": "text/csv", ".parquet": "application/vnd.apache.parquet",
+                ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+COMPRESSED_MIME = {"gzip": "application/gzip", "zstd": "application/zstd"}
+COMPRESSION_SUFFIX = {"gzip": ".gz", "zstd": ".zst"}
+
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+
+def export_formats():
+    formats = [".md", ".csv"]
+    if pa is not None:
+        formats.append(".parquet")
+    if xlsxwriter is not None or openpyxl is not None:
+        formats.append(".xlsx")
+    return formats + [".png", ".svg", ".txt"]
+
+def compression_options(export_format):
+    # xlsx is already a zip archive; Parquet compresses its pages internally
+    if export_format == ".csv":
+        return ["none", "gzip"] + (["zstd"] if zstandard is not None else [])
+    if export_format == ".parquet":
+        return ["zstd", "gzip", "snappy", "none"]
+    return ["none"]
+
+def _open_output(path, compression):
+    raw = open(path, 'wb')
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6), raw
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False), raw
+    return raw, None
+
+def _chunks(df, chunk_rows, max_rows=None):
+    # Out-of-core frames are streamed from their engine
+    if is_out_of_core(df):
+        remaining = len(df) if max_rows is None else max_rows
+        for chunk in df.iter_chunks(chunk_rows):
+            if remaining <= 0:
+                return
+            yield chunk.iloc[:remaining]
+            remaining -= len(chunk)
+        return
+    df = df if max_rows is None else df.iloc[:max_rows]
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def _write_csv(df, path, compression, chunk_rows, report):
+    stream, raw = _open_output(path, compression)
+    with io.TextIOWrapper(stream, encoding='utf-8', newline='') as text:
+        if len(df) == 0:
+            df.head(0).to_csv(text, index=False)
+        for i, chunk in enumerate(_chunks(df, chunk_rows)):
+            chunk.to_csv(text, index=False, header=i == 0)
+            report(len(chunk))
+    if raw is not None:
+        raw.close()
+
+def _write_parquet(df, path, compression, chunk_rows, report):
+    writer = None
+    try:
+        for chunk in _chunks(df, chunk_rows):
+            if writer is None:
+                # Every later chunk is converted to the schema of the first one
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                schema = table.schema
+                writer = pq.ParquetWriter(path, schema, compression=compression)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+            report(len(chunk))
+        if writer is None:
+            pq.write_table(pa.Table.from_pandas(df.head(0), preserve_index=False), path, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _write_xlsx(df, path, chunk_rows, report):
+    # Both writers stream rows to disk instead of holding the sheet in memory
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'remove_timezone': True,
+                                              'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+        sheet = workbook.add_worksheet("data")
+        append = lambda row_number, values: sheet.write_row(row_number, 0, values)
+    else:
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("data")
+        append = lambda row_number, values: sheet.append(values)
+
+    append(0, [str(col) for col in df.columns])
+    row_number = 1
+    for chunk in _chunks(df, chunk_rows, XLSX_MAX_ROWS):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for values in chunk.itertuples(index=False, name=None):
+            append(row_number, values)
+            row_number += 1
+        report(len(chunk))
+    if xlsxwriter is not None:
+        workbook.close()
+    else:
+        workbook.save(path)
+
+def export_dataframe(df, export_format, compression="none", chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    # Writes df to a temp file chunk by chunk and returns what the download button needs
+    compression = None if compression == "none" else compression
+    file_name = f"data{export_format}"
+    mime = DATA_FORMATS[export_format]
+    if export_format == ".csv" and compression:
+        file_name += COMPRESSION_SUFFIX[compression]
+        mime = COMPRESSED_MIME[compression]
+    handle, path = tempfile.mkstemp(prefix="eda_export_", suffix=os.path.splitext(file_name)[1], dir=EXPORT_DIR)
+    os.close(handle)
+
+    started = time.perf_counter()
+    written = [0]
+    def report(rows):
+        written[0] += rows
+        if progress is not None and len(df):
+            progress.progress(min(written[0] / len(df), 1.0), text=f"Exported {written[0]:,} of {len(df):,} rows")
+
+    try:
+        if export_format == ".csv":
+            _write_csv(df, path, compression, chunk_rows, report)
+        elif export_format == ".parquet":
+            _write_parquet(df, path, compression, chunk_rows, report)
+        else:
+            _write_xlsx(df, path, chunk_rows, report)
+    except Exception:
+        os.remove(path)
+        raise
+    seconds = max(time.perf_counter() - started, 1e-9)
+    size = os.path.getsize(path)
+    return {
+        "path": path,
+        "file_name": file_name,
+        "mime": mime,
+        "rows": written[0],
+        "bytes": size,
+        "seconds": seconds,
+        "rows_per_second": written[0] / seconds,
+        "megabytes_per_second": size / 1024 ** 2 / seconds,
+    }
+
+def _replace_export(export):
+    # Only the latest export of a session is kept on disk
+    previous = st.session_state.get("export")
+    if previous is not None and previous.get("path") and os.path.exists(previous["path"]):
+        os.remove(previous["path"])
+    st.session_state["export"] = export
 
 def export_report(df, eda_results, advanced_viz_results, ml_results):
     st.header("6. Export Options")
     
-    export_format = st.selectbox("Choose export format:", (".md", ".csv", ".png", ".svg", ".txt"))
+    export_format = st.selectbox("Choose export format:", export_formats())
+    compression = "none"
+    if export_format in DATA_FORMATS:
+        options = compression_options(export_format)
+        if len(options) > 1:
+            compression = st.selectbox("Compression:", options)
     
-    if st.button("Generate and Download Report"):
-        if export_format == ".md":
+    if st.button("Generate Report"):
+        # Data exports stream every row; reports describe the in-memory sample
+        if export_format not in DATA_FORMATS:
+            df = in_memory_frame(df)
+        if export_format in DATA_FORMATS:
+            if export_format == ".xlsx" and len(df) > XLSX_MAX_ROWS:
+                st.warning(f"Excel sheets hold at most {XLSX_MAX_ROWS:,} rows; the export is truncated.")
+            progress = st.progress(0.0, text="Exporting...")
+            _replace_export(export_dataframe(df, export_format, compression, progress=progress))
+        elif export_format == ".md":
             markdown_report = generate_markdown_report(df, eda_results, advanced_viz_results, ml_results)
-            download_report(markdown_report, "report.md", "text/markdown")
-        elif export_format == ".csv":
-            csv_report = df.to_csv(index=False)
-            download_report(csv_report, "data.csv", "text/csv")
+            _replace_export({"data": markdown_report, "file_name": "report.md", "mime": "text/markdown"})
         elif export_format in (".png", ".svg"):
-            img = generate_summary_plot(df, eda_results, ml_results)
-            download_report(img, f"summary_plot{export_format}", f"image/{export_format[1:]}")
+            img = generate_summary_plot(df, eda_results, ml_results, export_format[1:])
+            mime = "image/svg+xml" if export_format == ".svg" else "image/png"
+            _replace_export({"data": img, "file_name": f"summary_plot{export_format}", "mime": mime})
         else:  # .txt
             text_report = generate_text_report(df, eda_results, advanced_viz_results, ml_results)
-            download_report(text_report, "report.txt", "text/plain")
+            _replace_export({"data": text_report, "file_name": "report.txt", "mime": "text/plain"})
         
         st.success("Report generated and ready for download!")
 
+    export = st.session_state.get("export")
+    if export is not None:
+        download_report(export)
+
 def generate_markdown_report(df, eda_results, advanced_viz_results, ml_results):
     markdown_report = f"""
     # Data Analysis Report
@@ -82,7 +272,7 @@ def generate_text_report(df, eda_results, advanced_viz_results, ml_results):
     """
     return text_report
 
-def generate_summary_plot(df, eda_results, ml_results):
+def generate_summary_plot(df, eda_results, ml_results, image_format='png'):
     fig, axs = plt.subplots(2, 2, figsize=(20, 20))
     
     # Histograms
@@ -106,11 +296,25 @@ def generate_summary_plot(df, eda_results, ml_results):
     plt.tight_layout()
     
     img = io.BytesIO()
-    plt.savefig(img, format='png')
+    plt.savefig(img, format=image_format)
+    plt.close(fig)
     img.seek(0)
     return img.getvalue()
 
-def download_report(content, filename, mime_type):
-    b64 = base64.b64encode(content.encode()).decode() if isinstance(content, str) else base64.b64encode(content).decode()
-    href = f'<a href="data:{mime_type};base64,{b64}" download="{filename}">Download {filename}</a>'
-    st.markdown(href, unsafe_allow_html=True)
\ No newline at end of file
+def _read_export(path):
+    with open(path, 'rb') as handle:
+        return handle.read()
+
+def download_report(export):
+    # Served through Streamlit's media endpoint instead of a base64 data URI in the page
+    if "path" in export:
+        if not os.path.exists(export["path"]):
+            return
+        st.caption(f"{export['rows']:,} rows, {export['bytes'] / 1024 ** 2:,.1f} MB in {export['seconds']:.2f}s "
+                   f"({export['rows_per_second']:,.0f} rows/s, {export['megabytes_per_second']:,.1f} MB/s)")
+        # A callable is only read when the button is clicked, not on every rerun
+        st.download_button(f"Download {export['file_name']}", lambda: _read_export(export["path"]),
+                           file_name=export["file_name"], mime=export["mime"], on_click='ignore')
+    else:
+        st.download_button(f"Download {export['file_name']}", export["data"], file_name=export["file_name"],
+                           mime=export["mime"], on_click='ignore')
\ No newline at end of file
@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+from data_utils import profile_dataframe
+
+# Histogram gradient boosting bins every feature into at most 255 buckets, so
+# that is also the most categories a feature can have to be handled natively
+NATIVE_CATEGORY_LIMIT = 255
+# Columns with more distinct values become a single numeric 'frequency' feature
+# (share of rows with the same value) or are 'hash'ed into a few stable buckets
+HIGH_CARDINALITY_ENCODING = os.environ.get("EDA_HIGH_CARDINALITY_ENCODING", "frequency")
+HASH_BUCKETS = 128
+
+def label_codes(series):
+    # Integer codes (-1 for missing) and the values they stand for; pandas
+    # categoricals already hold both, anything else is factorized once
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes, uniques
+
+def frequency_encode(codes, n_categories):
+    counts = np.bincount(codes[codes >= 0], minlength=n_categories)
+    shares = counts / max(len(codes), 1)
+    return np.where(codes >= 0, shares[codes], np.nan)
+
+def hash_encode(codes, categories, buckets=HASH_BUCKETS):
+    # Hashes the distinct values only, then looks every row up by its code
+    bucket_of = (pd.util.hash_array(np.asarray(categories, dtype=object)) % buckets).astype(np.int16)
+    return np.where(codes >= 0, bucket_of[codes], -1).astype(np.int16)
+
+def encode_features(df, column_types=None, high_cardinality=HIGH_CARDINALITY_ENCODING):
+    # Returns the encoded frame and how each column was encoded: numeric columns
+    # pass through, datetimes become epoch seconds and label columns become
+    # 'native' codes or 'frequency'/'hash' features when they have too many values
+    column_types = column_types if column_types is not None else profile_dataframe(df)['dtype_class']
+    columns, encodings = {}, {}
+    for col in df.columns:
+        series = df[col]
+        if is_bool_dtype(series.dtype):
+            columns[col], encodings[col] = series.astype(np.float32), 'numeric'
+        elif is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col], encodings[col] = series, 'numeric'
+        elif is_datetime64_any_dtype(series.dtype):
+            values = series.to_numpy(dtype='datetime64[ns]')
+            columns[col] = np.where(np.isnat(values), np.nan, values.view(np.int64) / 1e9)
+            encodings[col] = 'datetime'
+        elif column_types[col] in ('categorical', 'text'):
+            codes, categories = label_codes(series)
+            if len(categories) <= NATIVE_CATEGORY_LIMIT:
+                columns[col], encodings[col] = codes, 'native'
+            elif high_cardinality == 'hash':
+                columns[col], encodings[col] = hash_encode(codes, categories), 'hash'
+            else:
+                columns[col], encodings[col] = frequency_encode(codes, len(categories)), 'frequency'
+    return pd.DataFrame(columns, index=df.index, copy=False), encodings
+
+def categorical_columns(encodings):
+    return [col for col, encoding in encodings.items() if encoding in ('native', 'hash')]
\ No newline at end of file
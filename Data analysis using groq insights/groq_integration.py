@@ -1,43 +1,167 @@
 import os
+import time
+import json
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from contextlib import closing
+from collections import defaultdict, deque
 import requests
-from groq import Groq
+from profiling import record_event, current_run
+from lazy_imports import lazy_import
 
-def validate_api_key(api_key):
-    url = "https://api.groq.com/openai/v1/models"
+# Point at a local stub server (e.g. http://127.0.0.1:8080) to exercise the app without the real API
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL")
+INSIGHTS_CACHE_PATH = os.environ.get("GROQ_INSIGHTS_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "eda_app", "groq_insights.sqlite"))
+INSIGHTS_CACHE_TTL = int(os.environ.get("GROQ_INSIGHTS_CACHE_TTL", 24 * 3600))
+SYSTEM_PROMPT = "You are an AI assistant specialized in data analysis and insights. Provide concise and relevant insights based on the given context."
+
+# Shared keep-alive session for the REST endpoints, with (connect, read) timeouts
+_session = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+REQUEST_TIMEOUT = (5, 20)
+MODELS_CACHE_TTL = int(os.environ.get("GROQ_MODELS_CACHE_TTL", 600))
+_models_cache = {}
+
+# Most recent call durations per endpoint, in seconds
+_latencies = defaultdict(lambda: deque(maxlen=200))
+
+def record_latency(endpoint, seconds, run=None):
+    _latencies[endpoint].append(seconds)
+    record_event(f"groq.{endpoint}", "groq", seconds, run=run)
+
+def latency_metrics():
+    metrics = {}
+    for endpoint, samples in _latencies.items():
+        ordered = sorted(samples)
+        metrics[endpoint] = {
+            "calls": len(ordered),
+            "last_ms": samples[-1] * 1000,
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+        }
+    return metrics
+
+def list_models(api_key, base_url=GROQ_BASE_URL):
+    # Validation and model listing share one cached request per key
+    cache_key = (hashlib.sha256(api_key.encode()).hexdigest(), base_url)
+    cached = _models_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < MODELS_CACHE_TTL:
+        return cached[1], cached[2]
+    
+    url = f"{(base_url or 'https://api.groq.com').rstrip('/')}/openai/v1/models"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
-    response = requests.get(url, headers=headers)
-    return response.status_code == 200
+    started = time.perf_counter()
+    try:
+        response = _session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        # Network failures are not cached so the next rerun retries
+        return False, []
+    finally:
+        record_latency("models", time.perf_counter() - started)
+    
+    valid = response.status_code == 200
+    models = [model['id'] for model in response.json()['data']] if valid else []
+    if valid or response.status_code in (401, 403):
+        _models_cache[cache_key] = (time.monotonic(), valid, models)
+    return valid, models
+
+def validate_api_key(api_key):
+    return list_models(api_key)[0]
 
 def fetch_groq_models(api_key):
-    url = "https://api.groq.com/openai/v1/models"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return [model['id'] for model in response.json()['data']]
-    else:
-        return []
-
-def get_groq_insights(api_key, model, context):
-    client = Groq(api_key=api_key)
+    return list_models(api_key)[1]
+
+def _messages(context):
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"Analyze the following data and provide insights:\n\n{context}"
+        }
+    ]
+
+def _prompt_hash(model, context):
+    return hashlib.sha256(json.dumps([model, _messages(context)]).encode()).hexdigest()
+
+def _cache_connection():
+    os.makedirs(os.path.dirname(INSIGHTS_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(INSIGHTS_CACHE_PATH, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS insights (prompt_hash TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)")
+    return conn
+
+def cached_insight(prompt_hash, ttl=INSIGHTS_CACHE_TTL):
+    with closing(_cache_connection()) as conn:
+        row = conn.execute("SELECT response FROM insights WHERE prompt_hash = ? AND created_at >= ?",
+                           (prompt_hash, time.time() - ttl)).fetchone()
+    return row[0] if row else None
+
+def store_insight(prompt_hash, response):
+    with closing(_cache_connection()) as conn:
+        conn.execute("INSERT OR REPLACE INTO insights VALUES (?, ?, ?)", (prompt_hash, response, time.time()))
+        conn.commit()
+
+def clear_insights_cache():
+    with closing(_cache_connection()) as conn:
+        removed = conn.execute("DELETE FROM insights").rowcount
+        conn.commit()
+    return removed
+
+# The SDK is only needed once insights are requested
+groq = lazy_import("groq")
+
+# One event loop thread and one AsyncGroq client per key live for the whole
+# process, so Streamlit reruns reuse the open HTTP connections
+_loop = None
+_loop_lock = threading.Lock()
+_async_clients = {}
+
+def _event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="groq-insights", daemon=True).start()
+    return _loop
+
+def _async_client(api_key, base_url):
+    key = (api_key, base_url)
+    if key not in _async_clients:
+        _async_clients[key] = groq.AsyncGroq(api_key=api_key, base_url=base_url)
+    return _async_clients[key]
+
+async def _fetch_insight(api_key, model, context, base_url, use_cache=True, run=None):
+    prompt_hash = _prompt_hash(model, context)
+    cached = cached_insight(prompt_hash) if use_cache else None
+    if cached is not None:
+        return cached
     
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an AI assistant specialized in data analysis and insights. Provide concise and relevant insights based on the given context."
-            },
-            {
-                "role": "user",
-                "content": f"Analyze the following data and provide insights:\n\n{context}"
-            }
-        ],
+    started = time.perf_counter()
+    chat_completion = await _async_client(api_key, base_url).chat.completions.create(
+        messages=_messages(context),
         model=model,
     )
+    record_latency("chat_completions", time.perf_counter() - started, run)
     
-    return chat_completion.choices[0].message.content
\ No newline at end of file
+    response = chat_completion.choices[0].message.content
+    store_insight(prompt_hash, response)
+    return response
+
+def submit_groq_insights(api_key, model, context, base_url=GROQ_BASE_URL, use_cache=True):
+    # Returns a concurrent.futures.Future so independent prompts run concurrently; the
+    # loop thread has its own context, so the caller's profile run is passed along
+    return asyncio.run_coroutine_threadsafe(_fetch_insight(api_key, model, context, base_url, use_cache, current_run()), _event_loop())
+
+def get_groq_insights_batch(api_key, model, contexts, base_url=GROQ_BASE_URL):
+    futures = [submit_groq_insights(api_key, model, context, base_url) for context in contexts]
+    return [future.result() for future in futures]
+
+def get_groq_insights(api_key, model, context, base_url=GROQ_BASE_URL, use_cache=True):
+    return submit_groq_insights(api_key, model, context, base_url, use_cache).result()
\ No newline at end of file
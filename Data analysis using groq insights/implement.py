@@ -1,29 +1,23 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, LabelEncoder, OrdinalEncoder
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, accuracy_score
-import io
-import base64
-import sweetviz as sv
-from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype, is_categorical_dtype, is_object_dtype
-from groq_integration import validate_api_key, fetch_groq_models, get_groq_insights
-from data_loader import load_data, display_data_overview
+import os
+from groq_integration import validate_api_key, fetch_groq_models, submit_groq_insights, latency_metrics
+from data_loader import load_data, display_data_overview, list_excel_sheets
 from data_preprocessing import preprocess_data, preprocess_column
-from exploratory_analysis import perform_eda
-from advanced_visualizations import create_advanced_visualizations
-from machine_learning import perform_machine_learning
+from data_utils import optimize_dtypes
+from exploratory_analysis import compute_eda
+from advanced_visualizations import compute_visualizations
+from machine_learning import compute_machine_learning, ML_CORE_BUDGET
 from export_options import export_report
+from data_cache import cache_available, file_content_hash, load_cached_dataset, store_cached_dataset, cache_entries, clear_cache
+from pipeline import Pipeline, render_outputs
+from llm_context import build_eda_context, build_ml_context, measure_context_compaction
+from profiling import start_run, profile_stage, render_profile_panel
+from compute_backend import COMPUTE_BACKEND, available_backends, choose_backend, is_out_of_core, in_memory_frame
 
 # Set page configuration
 st.set_page_config(page_title="Comprehensive EDA App", layout="wide")
+profile_run = start_run()
 
 # Custom CSS for improved UI/UX
 st.markdown("""
@@ -64,6 +58,25 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Analysis stages after preprocessing; results are memoized in the session
+# and only recomputed when the preprocessed data they depend on changes
+pipeline = Pipeline(st.session_state.setdefault("pipeline_memo", {}))
+pipeline.stage("eda", depends_on=["data"])(compute_eda)
+# The data itself for pandas; a sample when the data is queried out of core
+pipeline.stage("in_memory", depends_on=["data"])(in_memory_frame)
+pipeline.stage("visualizations", depends_on=["in_memory"])(compute_visualizations)
+pipeline.stage("machine_learning", depends_on=["in_memory"])(compute_machine_learning)
+
+# Insight requests are dispatched as soon as their context is ready and
+# written into their placeholders once everything else has rendered
+insight_slots = []
+
+def show_insights(title, context):
+    st.subheader(title)
+    slot = st.empty()
+    slot.caption("Generating insights...")
+    insight_slots.append((slot, submit_groq_insights(api_key, selected_model, context)))
+
 # Main app logic
 st.title("Comprehensive EDA and Data Analysis App with LLM Intelligence")
 
@@ -81,72 +94,138 @@ if api_key:
 st.header("1. File Upload and Data Quality Assessment")
 
 uploaded_file = st.file_uploader("Choose a CSV or XLSX file", type=["csv", "xlsx"])
+backends = ["auto"] + available_backends()
+backend = st.sidebar.selectbox("Compute backend:", backends, index=backends.index(COMPUTE_BACKEND) if COMPUTE_BACKEND in backends else 0,
+                               help="auto keeps small files in pandas and queries large CSV files on disk with DuckDB or Polars.")
+
+if cache_available():
+    with st.sidebar.expander("Dataset cache"):
+        entries = cache_entries()
+        if entries:
+            st.write(pd.DataFrame(entries)[["source_name", "size_bytes", "last_used", "key"]])
+        else:
+            st.write("The cache is empty.")
+        if st.button("Clear dataset cache"):
+            st.success(f"Removed {clear_cache()} cached dataset(s).")
 
 if uploaded_file is not None:
-    df = load_data(uploaded_file)
+    sheets = None
+    if not uploaded_file.name.endswith('.csv'):
+        sheet_names = list_excel_sheets(uploaded_file)
+        sheets = sheet_names
+        if len(sheet_names) > 1:
+            sheets = st.multiselect("Sheets to load:", sheet_names, default=sheet_names[:1])
+    with profile_stage("load") as stage:
+        # Only in-memory loads are cached; out-of-core engines keep their own columnar copy
+        in_memory = choose_backend(uploaded_file, backend) == "pandas"
+        cache_key = file_content_hash(uploaded_file, sheets) if in_memory and cache_available() else None
+        df = load_cached_dataset(cache_key) if cache_key else None
+        from_cache = df is not None
+        if not from_cache:
+            df = load_data(uploaded_file, sheets=sheets, backend=backend)
+        stage.update(output=df, cached=from_cache, backend=df.engine if is_out_of_core(df) else "pandas")
+    if from_cache:
+        st.success("Loaded preprocessed dataset from cache.")
     if df is not None:
-        # Convert problematic columns to appropriate types
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].astype('string')
-            elif df[col].dtype == 'int64':
-                df[col] = df[col].astype('Int64')  # nullable integer type
+        if not from_cache and not is_out_of_core(df):
+            # Compact dtypes before anything else holds on to the frame
+            with profile_stage("optimize_dtypes", df):
+                df, memory_report = optimize_dtypes(df)
+            before, after = memory_report['bytes_before'].sum(), memory_report['bytes_after'].sum()
+            with st.expander(f"Memory: {before / 1024 ** 2:,.1f} MB -> {after / 1024 ** 2:,.1f} MB after dtype optimization"):
+                st.write(memory_report)
 
         # Get AI insights on the data
-        initial_insights = get_groq_insights(api_key, selected_model, df.head().to_string())
-        st.subheader("AI Insights on Data")
-        st.write(initial_insights)
+        show_insights("AI Insights on Data", df.head().to_string())
         
         # Display data overview
-        display_data_overview(df)
+        with profile_stage("data_overview", df):
+            display_data_overview(df)
         
         # Intelligent data preprocessing
-        with st.spinner("Preprocessing data..."):
-            original_df = df.copy()  # Keep a copy of the original dataset
-            df = df.apply(preprocess_column)
+        if not from_cache and not is_out_of_core(df):
+            with st.spinner("Preprocessing data..."), profile_stage("preprocess_column", df):
+                df = df.apply(preprocess_column)
+            if cache_key:
+                with profile_stage("store_cache", df):
+                    store_cached_dataset(cache_key, df, uploaded_file.name)
         
         # Data preprocessing
-        df = preprocess_data(df)
+        with profile_stage("preprocess_data", df) as stage:
+            df = preprocess_data(df)
+            stage.update(output=df)
         
         # Get AI insights on preprocessed data
-        preprocessed_insights = get_groq_insights(api_key, selected_model, df.head().to_string())
-        st.subheader("AI Insights on Preprocessed Data")
-        st.write(preprocessed_insights)
+        show_insights("AI Insights on Preprocessed Data", df.head().to_string())
+        
+        # Out-of-core frames are fingerprinted by their file and cleaning steps
+        pipeline.set_input("data", df, key=df.key if is_out_of_core(df) else None)
         
         # Exploratory Data Analysis
-        eda_results = perform_eda(df)
+        correlation_method = st.sidebar.radio("Correlation method:", ("Pearson", "Spearman")).lower()
+        eda = pipeline.run("eda", correlation_method=correlation_method)
+        render_outputs(eda["outputs"])
+        eda_results = eda["results"]
         
         # Get AI insights on EDA results
-        eda_insights = get_groq_insights(api_key, selected_model, str(eda_results))
-        st.subheader("AI Insights on Exploratory Data Analysis")
-        st.write(eda_insights)
+        eda_context = build_eda_context(df, eda_results)
+        show_insights("AI Insights on Exploratory Data Analysis", eda_context)
         
         # Advanced Visualizations
-        advanced_viz_results = create_advanced_visualizations(df)
+        if is_out_of_core(df):
+            sample = pipeline.run("in_memory")
+            st.caption(f"Visualizations, models and reports use a random sample of {len(sample):,} of {len(df):,} rows.")
+        visualizations = pipeline.run("visualizations")
+        render_outputs(visualizations["outputs"])
+        advanced_viz_results = visualizations["results"]
         
         # Get AI insights on advanced visualizations
-        viz_insights = get_groq_insights(api_key, selected_model, str(advanced_viz_results))
-        st.subheader("AI Insights on Advanced Visualizations")
-        st.write(viz_insights)
+        show_insights("AI Insights on Advanced Visualizations", str(advanced_viz_results))
         
         # Machine Learning Features
-        ml_results = perform_machine_learning(df)
+        ml_cores = st.sidebar.number_input("CPU cores for model training:", min_value=1, max_value=os.cpu_count() or 1, value=min(ML_CORE_BUDGET, os.cpu_count() or 1))
+        quick_profile = st.sidebar.radio("Model training mode:", ("Full data", "Quick profile")) == "Quick profile"
+        pinned_targets = st.sidebar.multiselect("Targets to train on full data:", list(df.columns)) if quick_profile else []
+        progress_bar = st.progress(0.0, text="Training models...")
+        machine_learning = pipeline.run(
+            "machine_learning", quick_profile=quick_profile, pinned_targets=pinned_targets,
+            # The core count changes how fast models train, not what they learn
+            untracked={"cores": ml_cores,
+                       "progress": lambda done, total: progress_bar.progress(done / total, text=f"Trained {done}/{total} models")})
+        progress_bar.empty()
+        render_outputs(machine_learning["outputs"])
+        ml_results = machine_learning["results"]
         
         if ml_results:
             # Get AI insights on machine learning results
-            ml_insights = get_groq_insights(api_key, selected_model, str(ml_results))
-            st.subheader("AI Insights on Machine Learning Results")
-            st.write(ml_insights)
+            ml_context = build_ml_context(ml_results)
+            show_insights("AI Insights on Machine Learning Results", ml_context)
         
         # Export Options
-        export_report(df, eda_results, advanced_viz_results, ml_results)
+        with profile_stage("export", df):
+            export_report(df, eda_results, advanced_viz_results, ml_results)
         
         # Allow user to ask for specific insights
         user_question = st.text_input("Ask for specific insights:")
         if user_question:
-            specific_insights = get_groq_insights(api_key, selected_model, f"{user_question}\n\nContext:\n{df.head().to_string()}")
-            st.subheader("Specific Insights")
-            st.write(specific_insights)
+            show_insights("Specific Insights", f"{user_question}\n\nContext:\n{df.head().to_string()}")
+        
+        with profile_stage("groq.wait_for_insights", category="groq"):
+            for slot, future in insight_slots:
+                slot.write(future.result())
+        
+        with st.sidebar.expander("Prompt size before/after compaction"):
+            contexts = {"eda": (str(eda_results), eda_context)}
+            if ml_results:
+                contexts["machine_learning"] = (str(ml_results), ml_context)
+            measure_latency = st.checkbox("Also measure LLM latency (uncached calls)")
+            st.write(measure_context_compaction(contexts, api_key if measure_latency else None, selected_model if measure_latency else None))
 
 else:
-    st.info("Please upload a CSV or XLSX file to begin the analysis.")
\ No newline at end of file
+    st.info("Please upload a CSV or XLSX file to begin the analysis.")
+
+if latency_metrics():
+    with st.sidebar.expander("Groq API latency"):
+        st.write(pd.DataFrame(latency_metrics()).T)
+
+render_profile_panel(profile_run)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import re
+import sys
+import time
+import types
+import argparse
+import importlib
+import importlib.util
+import subprocess
+import pandas as pd
+from profiling import record_event
+
+# Heavy libraries (plotly, matplotlib, seaborn, scipy, sklearn, groq) are bound to a
+# LazyModule at import time and only imported when a stage first touches them,
+# so the app renders its first widgets without paying for them.
+#   python lazy_imports.py implement      -> where the eager import time goes
+
+IMPORT_REPORT_TOP = 25
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Seconds each lazily imported module took, in load order
+_load_times = {}
+
+class LazyModule(types.ModuleType):
+    # Stands in for a module until the first attribute lookup
+    def __getattr__(self, attr):
+        return getattr(_load(self.__name__), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__name__ in sys.modules else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+def _load(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    seconds = time.perf_counter() - started
+    _load_times[name] = seconds
+    # Shows up in the profile panel next to the stage that triggered it
+    record_event(f"import {name}", "import", seconds, started=started)
+    return module
+
+def lazy_import(name, optional=False):
+    # Already-imported modules are returned as they are; optional modules that
+    # are not installed give None, like the try/except ImportError pattern
+    if name in sys.modules:
+        return sys.modules[name]
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
+
+def lazy_load_times():
+    return dict(_load_times)
+
+def import_time_report(module="implement", python=sys.executable, top=IMPORT_REPORT_TOP):
+    # Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+    # sums the self time per top-level package
+    completed = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({"module": name, "package": name.split(".")[0], "depth": len(indent) // 2,
+                         "self_s": int(self_us) / 1e6, "cumulative_s": int(cumulative_us) / 1e6})
+    imports = pd.DataFrame(rows, columns=["module", "package", "depth", "self_s", "cumulative_s"])
+    packages = (imports.groupby("package")["self_s"].agg(["sum", "count"])
+                .rename(columns={"sum": "seconds", "count": "modules"})
+                .sort_values("seconds", ascending=False))
+    packages["share"] = packages["seconds"] / packages["seconds"].sum() if len(packages) else 0.0
+    return {
+        "total_s": imports["self_s"].sum(),
+        "packages": packages.head(top),
+        "modules": imports.sort_values("self_s", ascending=False).head(top),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report where the import time of a module goes.")
+    parser.add_argument("module", nargs="?", default="implement")
+    parser.add_argument("--top", type=int, default=IMPORT_REPORT_TOP)
+    args = parser.parse_args(argv)
+    report = import_time_report(args.module, top=args.top)
+    print(f"Importing {args.module} took {report['total_s']:.2f}s\n")
+    print(report["packages"].to_string(float_format=lambda value: f"{value:.3f}"))
+    print()
+    print(report["modules"].to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from data_utils import profile_dataframe
+from groq_integration import get_groq_insights
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("LLM_CONTEXT_TOKEN_BUDGET", 1500))
+# Rough English/JSON average; avoids depending on a tokenizer
+CHARS_PER_TOKEN = 4
+PROFILE_COLUMNS = 40
+TOP_CORRELATIONS = 15
+TOP_FEATURES = 5
+TOP_TARGETS = 20
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _scaled(count, scale):
+    return max(1, int(count * scale))
+
+def _fit_to_budget(render, token_budget):
+    # Halve every section's item count until the text fits, then hard-truncate
+    scale = 1.0
+    text = render(scale)
+    while estimate_tokens(text) > token_budget and scale > 0.05:
+        scale /= 2
+        text = render(scale)
+    return text[:token_budget * CHARS_PER_TOKEN]
+
+def _format_value(value):
+    return f"{value:.4g}" if isinstance(value, (float, np.floating)) else str(value)
+
+def profile_lines(df, max_columns):
+    profile = profile_dataframe(df)
+    lines = [f"{len(df):,} rows x {len(df.columns)} columns"]
+    for col, stats in profile.head(max_columns).iterrows():
+        null_share = stats['null_count'] / len(df) if len(df) else 0
+        line = f"- {col}: {stats['dtype_class']}, {null_share:.0%} null, {stats['nunique']} unique"
+        if stats['dtype_class'] in ('numeric', 'datetime') and not pd.isna(stats['min']):
+            line += f", range {_format_value(stats['min'])} to {_format_value(stats['max'])}"
+        lines.append(line)
+    if len(profile) > max_columns:
+        lines.append(f"- ... {len(profile) - max_columns} more columns")
+    return lines
+
+def top_correlations(pairs, k):
+    # Pairs come from the correlation engine already sorted by strength
+    return [f"- {pair['column_a']} ~ {pair['column_b']}: {pair['correlation']:+.2f}" for pair in pairs[:k]]
+
+def top_features(ml_results, k, max_targets):
+    lines = []
+    for target, result in list(ml_results.items())[:max_targets]:
+        importance = pd.DataFrame(result['feature_importance']).nlargest(k, 'importance')
+        features = ", ".join(f"{row.feature} ({row.importance:.2f})" for row in importance.itertuples())
+        performance = ", ".join(f"{name}={value:.3f}" for name, value in result['performance'].items())
+        lines.append(f"- {target} [{performance}]: {features}")
+    if len(ml_results) > max_targets:
+        lines.append(f"- ... {len(ml_results) - max_targets} more targets")
+    return lines
+
+def build_eda_context(df, eda_results, token_budget=CONTEXT_TOKEN_BUDGET):
+    def render(scale):
+        sections = ["Dataset profile:"] + profile_lines(df, _scaled(PROFILE_COLUMNS, scale))
+        correlations = top_correlations(eda_results.get("top_correlations", []), _scaled(TOP_CORRELATIONS, scale))
+        if correlations:
+            sections += ["", "Strongest correlations:"] + correlations
+        return "\n".join(sections)
+    return _fit_to_budget(render, token_budget)
+
+def build_ml_context(ml_results, token_budget=CONTEXT_TOKEN_BUDGET):
+    def render(scale):
+        lines = top_features(ml_results, _scaled(TOP_FEATURES, scale), _scaled(TOP_TARGETS, scale))
+        return "\n".join(["Top features per target (importance) with model scores:"] + lines)
+    return _fit_to_budget(render, token_budget)
+
+def measure_context_compaction(contexts, api_key=None, model=None):
+    # contexts maps a name to (raw_text, compact_text); latency is only measured
+    # when an API key and model are given, bypassing the insights cache
+    rows = []
+    for name, (raw, compact) in contexts.items():
+        row = {
+            "context": name,
+            "raw_chars": len(raw),
+            "raw_tokens": estimate_tokens(raw),
+            "compact_chars": len(compact),
+            "compact_tokens": estimate_tokens(compact),
+        }
+        row["reduction"] = 1 - row["compact_chars"] / row["raw_chars"] if row["raw_chars"] else 0.0
+        if api_key and model:
+            for kind, text in (("raw", raw), ("compact", compact)):
+                started = time.perf_counter()
+                try:
+                    get_groq_insights(api_key, model, text, use_cache=False)
+                    row[f"{kind}_latency_s"] = time.perf_counter() - started
+                except Exception as e:
+                    row[f"{kind}_latency_s"] = None
+                    row[f"{kind}_error"] = str(e)
+        rows.append(row)
+    return pd.DataFrame(rows)
\ No newline at end of file
@@ -1,78 +1,255 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, accuracy_score, r2_score, f1_score
-from sklearn.preprocessing import LabelEncoder
 from pandas.api.types import is_numeric_dtype, is_categorical_dtype, is_object_dtype, is_string_dtype
-import plotly.express as px
-from data_utils import infer_data_type, check_and_preprocess
-
-def encode_categorical(df):
-    encoder = LabelEncoder()
-    for col in df.columns:
-        if infer_data_type(df[col]) in ['categorical', 'text']:
-            df[col] = encoder.fit_transform(df[col].astype(str))
-    return df
-
-def perform_machine_learning(df):
-    st.header("5. Machine Learning Features")
+from data_utils import profile_dataframe, check_and_preprocess
+from feature_encoding import NATIVE_CATEGORY_LIMIT, encode_features, categorical_columns
+from pipeline import render_outputs
+from lazy_imports import lazy_import
+
+# Cores available for model training; per-target fits are spread across them
+ML_CORE_BUDGET = int(os.environ.get("EDA_ML_CORES", os.cpu_count() or 1))
+
+# Quick profile mode: growing sample sizes and when to consider the result stable
+QUICK_PROFILE_SAMPLE_SIZES = (2_000, 10_000, 50_000, 250_000)
+QUICK_PROFILE_RANK_AGREEMENT = 0.9
+QUICK_PROFILE_SCORE_TOLERANCE = 0.02
+QUICK_PROFILE_STRATA = 10
+
+# "hist_gradient_boosting" bins features once and splits label-coded columns
+# natively; "random_forest" is the previous engine
+ML_ENGINE = os.environ.get("EDA_ML_ENGINE", "hist_gradient_boosting")
+# Gradient boosting has no impurity importances; permutation importance is
+# measured on at most this many held-out rows
+IMPORTANCE_MAX_ROWS = 5_000
+IMPORTANCE_REPEATS = 3
+# Boosting grows one tree per class per iteration and permutation importance
+# predicts every class again per feature; targets with more classes use a
+# random forest and its impurity importances instead
+ML_MAX_BOOSTED_CLASSES = int(os.environ.get("EDA_ML_MAX_BOOSTED_CLASSES", 10))
+
+px = lazy_import("plotly.express")
+ensemble = lazy_import("sklearn.ensemble")
+model_selection = lazy_import("sklearn.model_selection")
+metrics = lazy_import("sklearn.metrics")
+inspection = lazy_import("sklearn.inspection")
+threadpoolctl = lazy_import("threadpoolctl")
+
+def build_model(target_type, n_jobs=None, categorical=(), engine=ML_ENGINE):
+    if engine == 'random_forest':
+        if target_type == 'categorical':
+            return ensemble.RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        return ensemble.RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    categorical = list(categorical) or None
+    if target_type == 'categorical':
+        return ensemble.HistGradientBoostingClassifier(categorical_features=categorical, random_state=42)
+    return ensemble.HistGradientBoostingRegressor(categorical_features=categorical, random_state=42)
+
+def choose_engine(target_type, y, engine=ML_ENGINE):
+    if target_type == 'categorical' and y.nunique() > ML_MAX_BOOSTED_CLASSES:
+        return 'random_forest'
+    return engine
+
+def _importances(model, X_test, y_test):
+    if hasattr(model, 'feature_importances_'):
+        return model.feature_importances_
+    permuted = inspection.permutation_importance(
+        model, X_test, y_test, n_repeats=IMPORTANCE_REPEATS, random_state=42,
+        max_samples=min(len(X_test), IMPORTANCE_MAX_ROWS),
+    )
+    # Scaled like impurity importances: non-negative and summing to one
+    importances = np.clip(permuted.importances_mean, 0, None)
+    total = importances.sum()
+    return importances / total if total > 0 else importances
+
+def fit_target_model(df_encoded, target_column, target_type, n_jobs=None, categorical=()):
+    y = df_encoded[target_column]
+    # Missing targets are -1 codes or NaN; neither can be learned
+    keep = (y >= 0) if target_type == 'categorical' else y.notna()
+    if not keep.all():
+        df_encoded, y = df_encoded[keep], y[keep]
+    X = df_encoded.drop(columns=[target_column])
+    categorical = [col for col in categorical if col != target_column]
     
-    # Encode categorical variables
-    df_encoded = encode_categorical(df.copy())
+    model = build_model(target_type, n_jobs, categorical, choose_engine(target_type, y))
     
-    results = {}
+    X_train, X_test, y_train, y_test = model_selection.train_test_split(X, y, test_size=0.2, random_state=42)
+    # Gradient boosting threads through OpenMP rather than n_jobs
+    with threadpoolctl.threadpool_limits(n_jobs):
+        model.fit(X_train, y_train)
+        importances = _importances(model, X_test, y_test)
     
+    feature_importance = pd.DataFrame({'feature': X.columns, 'importance': importances})
+    feature_importance = feature_importance.sort_values('importance', ascending=False)
+    
+    y_pred = model.predict(X_test)
+    
+    if target_type == 'categorical':
+        performance = {'accuracy': metrics.accuracy_score(y_test, y_pred), 'f1_score': metrics.f1_score(y_test, y_pred, average='weighted')}
+    else:
+        performance = {'mse': metrics.mean_squared_error(y_test, y_pred), 'r2_score': metrics.r2_score(y_test, y_pred)}
+    
+    return {"feature_importance": feature_importance, "performance": performance}
+
+def stratified_sample(df_encoded, target_column, target_type, size, random_state=42):
+    target = df_encoded[target_column]
+    if target_type == 'categorical':
+        strata = target
+    else:
+        strata = pd.qcut(target.rank(method='first'), QUICK_PROFILE_STRATA, labels=False)
+    fraction = size / len(df_encoded)
+    return df_encoded.groupby(strata, group_keys=False, observed=True, dropna=False).sample(frac=fraction, random_state=random_state)
+
+def _score(fit):
+    performance = fit["performance"]
+    return performance['accuracy'] if 'accuracy' in performance else performance['r2_score']
+
+def _has_stabilized(previous, current):
+    if abs(_score(current) - _score(previous)) > QUICK_PROFILE_SCORE_TOLERANCE:
+        return False
+    before = previous["feature_importance"].set_index('feature')['importance']
+    after = current["feature_importance"].set_index('feature')['importance'].reindex(before.index)
+    if len(before) < 2:
+        return True
+    agreement = before.rank().corr(after.rank())
+    return not pd.isna(agreement) and agreement >= QUICK_PROFILE_RANK_AGREEMENT
+
+def quick_profile_target(df_encoded, target_column, target_type, n_jobs=None, categorical=()):
+    # Fit on growing stratified samples and stop once the importance ranking and score settle
+    previous = None
+    compared = False
+    for size in QUICK_PROFILE_SAMPLE_SIZES:
+        if size >= len(df_encoded):
+            break
+        sample = stratified_sample(df_encoded, target_column, target_type, size)
+        fit = fit_target_model(sample, target_column, target_type, n_jobs, categorical)
+        fit["sample_rows"] = len(sample)
+        if previous is not None:
+            compared = True
+            if _has_stabilized(previous, fit):
+                return fit
+        previous = fit
+    if compared:
+        # Unpinned targets never get a full-data fit; the largest sample is used instead
+        return previous
+    # A single sample was never checked for stability, so it cannot stand in for the data
+    fit = fit_target_model(df_encoded, target_column, target_type, n_jobs, categorical)
+    fit["sample_rows"] = len(df_encoded)
+    return fit
+
+def _fit(df_encoded, target_column, target_type, n_jobs, quick, categorical=()):
+    if quick:
+        return quick_profile_target(df_encoded, target_column, target_type, n_jobs, categorical)
+    return fit_target_model(df_encoded, target_column, target_type, n_jobs, categorical)
+
+# The encoded frame is handed to each worker once instead of being pickled per target
+_worker_frame = None
+_worker_categorical = ()
+
+def _init_worker(df_encoded, categorical=()):
+    global _worker_frame, _worker_categorical
+    _worker_frame, _worker_categorical = df_encoded, categorical
+
+def _fit_in_worker(target_column, target_type, n_jobs, quick):
+    try:
+        return target_column, _fit(_worker_frame, target_column, target_type, n_jobs, quick, _worker_categorical), None
+    except Exception as e:
+        return target_column, None, str(e)
+
+def fit_target_models(df_encoded, targets, cores=ML_CORE_BUDGET, progress=None, quick_targets=(), categorical=()):
+    fits = {}
+    if not targets:
+        return fits
+    workers = max(1, min(cores, len(targets)))
+    # Cores left over after one process per target go to each model's own threads
+    threads_per_fit = max(1, cores // workers)
+
+    if workers == 1:
+        for done, (target_column, target_type) in enumerate(targets.items(), start=1):
+            try:
+                fits[target_column] = (_fit(df_encoded, target_column, target_type, threads_per_fit, target_column in quick_targets, categorical), None)
+            except Exception as e:
+                fits[target_column] = (None, str(e))
+            if progress:
+                progress(done, len(targets))
+        return fits
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df_encoded, categorical)) as executor:
+        futures = [executor.submit(_fit_in_worker, target_column, target_type, threads_per_fit, target_column in quick_targets)
+                   for target_column, target_type in targets.items()]
+        for done, future in enumerate(as_completed(futures), start=1):
+            target_column, fit, error = future.result()
+            fits[target_column] = (fit, error)
+            if progress:
+                progress(done, len(targets))
+    return fits
+
+def compute_machine_learning(df, cores=ML_CORE_BUDGET, progress=None, quick_profile=False, pinned_targets=()):
+    outputs = [('header', "5. Machine Learning Features")]
+    
+    # Category codes are reused as they are; only high-cardinality text is re-encoded
+    column_types = profile_dataframe(df)['dtype_class']
+    df_encoded, encodings = encode_features(df, column_types)
+    categorical = categorical_columns(encodings)
+    
+    # Check which target variables are suitable for machine learning; types come
+    # from the original columns, since encoded labels all look numeric
+    targets = {}
     for target_column in df_encoded.columns:
-        st.subheader(f"Analysis for target: {target_column}")
+        target_type = column_types[target_column]
+        if target_type == 'numeric' or (target_type == 'categorical' and encodings[target_column] == 'native'):
+            targets[target_column] = target_type
+    
+    # In quick profile mode only pinned targets get a full-data fit
+    quick_targets = {col for col in targets if col not in pinned_targets} if quick_profile else set()
+    fits = fit_target_models(df_encoded, targets, cores, progress, quick_targets, categorical)
+    
+    results = {}
+    
+    for target_column in df.columns:
+        outputs.append(('subheader', f"Analysis for target: {target_column}"))
         
-        try:
-            X = df_encoded.drop(columns=[target_column])
-            y = df_encoded[target_column]
-            
-            # Check if the target variable is suitable for machine learning
-            target_type = infer_data_type(y)
-            if target_type not in ['numeric', 'categorical']:
-                st.warning(f"Skipping {target_column} as it's not suitable for machine learning (not numeric or categorical).")
-                continue
-            
-            if target_type == 'categorical':
-                model = RandomForestClassifier(n_estimators=100, random_state=42)
-            else:
-                model = RandomForestRegressor(n_estimators=100, random_state=42)
-            
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            model.fit(X_train, y_train)
-            
-            feature_importance = pd.DataFrame({'feature': X.columns, 'importance': model.feature_importances_})
-            feature_importance = feature_importance.sort_values('importance', ascending=False)
-            
-            st.plotly_chart(px.bar(feature_importance, x='feature', y='importance', title=f"Feature Importance for {target_column}"))
-            
-            y_pred = model.predict(X_test)
-            
-            if target_type == 'categorical':
-                accuracy = accuracy_score(y_test, y_pred)
-                f1 = f1_score(y_test, y_pred, average='weighted')
-                st.write(f"Model Accuracy: {accuracy:.2f}")
-                st.write(f"F1 Score: {f1:.2f}")
-                performance = {'accuracy': accuracy, 'f1_score': f1}
+        if target_column not in targets:
+            if column_types[target_column] == 'categorical' and target_column in df_encoded.columns:
+                outputs.append(('warning', f"Skipping {target_column} as it has more than {NATIVE_CATEGORY_LIMIT} categories."))
             else:
-                mse = mean_squared_error(y_test, y_pred)
-                r2 = r2_score(y_test, y_pred)
-                st.write(f"Model Mean Squared Error: {mse:.2f}")
-                st.write(f"R-squared Score: {r2:.2f}")
-                performance = {'mse': mse, 'r2_score': r2}
-            
-            results[target_column] = {
-                "feature_importance": feature_importance.to_dict(),
-                "performance": performance
-            }
+                outputs.append(('warning', f"Skipping {target_column} as it's not suitable for machine learning (not numeric or categorical)."))
+            continue
         
-        except Exception as e:
-            st.error(f"An error occurred during machine learning tasks for {target_column}: {str(e)}")
-            st.write(f"Data type of {target_column}: {infer_data_type(df_encoded[target_column])}")
-            st.write(f"Unique values in {target_column}: {df_encoded[target_column].unique()}")
+        fit, error = fits[target_column]
+        if error is not None:
+            outputs.append(('error', f"An error occurred during machine learning tasks for {target_column}: {error}"))
+            outputs.append(('write', f"Data type of {target_column}: {targets[target_column]}"))
+            outputs.append(('write', f"Unique values in {target_column}: {df[target_column].unique()}"))
+            continue
+        
+        feature_importance = fit["feature_importance"]
+        performance = fit["performance"]
+        outputs.append(('figure', px.bar(feature_importance, x='feature', y='importance', title=f"Feature Importance for {target_column}")))
+        if "sample_rows" in fit and fit["sample_rows"] < len(df_encoded):
+            outputs.append(('caption', f"Quick profile: trained on a stratified sample of {fit['sample_rows']:,} of {len(df_encoded):,} rows."))
+        
+        if targets[target_column] == 'categorical':
+            outputs.append(('write', f"Model Accuracy: {performance['accuracy']:.2f}"))
+            outputs.append(('write', f"F1 Score: {performance['f1_score']:.2f}"))
+        else:
+            outputs.append(('write', f"Model Mean Squared Error: {performance['mse']:.2f}"))
+            outputs.append(('write', f"R-squared Score: {performance['r2_score']:.2f}"))
+        
+        results[target_column] = {
+            "feature_importance": feature_importance.to_dict(),
+            "performance": performance
+        }
+        if "sample_rows" in fit:
+            results[target_column]["sample_rows"] = fit["sample_rows"]
     
-    return results
\ No newline at end of file
+    return {"outputs": outputs, "results": results}
+
+def perform_machine_learning(df, cores=ML_CORE_BUDGET):
+    progress_bar = st.progress(0.0, text="Training models...")
+    machine_learning = compute_machine_learning(df, cores, lambda done, total: progress_bar.progress(done / total, text=f"Trained {done}/{total} models"))
+    progress_bar.empty()
+    render_outputs(machine_learning["outputs"])
+    return machine_learning["results"]
\ No newline at end of file
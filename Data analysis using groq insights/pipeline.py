@@ -0,0 +1,104 @@
+import hashlib
+import pickle
+import numpy as np
+import pandas as pd
+import streamlit as st
+from timeseries import render_timeseries
+from profiling import profile_stage, record_event
+
+def _update_digest(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr((type(value).__name__, value.shape)).encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr([(str(col), str(dtype)) for col, dtype in value.dtypes.items()]).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError:
+            # Unhashable cells (lists, dicts); fall back to pickling the values
+            digest.update(pickle.dumps(value))
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+def fingerprint(value):
+    digest = hashlib.sha256()
+    _update_digest(digest, value)
+    return digest.hexdigest()
+
+class Pipeline:
+    # Stages form a DAG; a stage is only recomputed when the fingerprint of its
+    # upstream results or its own parameters changes. Results live in `memo`,
+    # which is st.session_state in the app so they survive reruns.
+    def __init__(self, memo=None):
+        self.stages = {}
+        self.memo = memo if memo is not None else {}
+        self.results = {}
+        self.fingerprints = {}
+        self.recomputed = []
+
+    def stage(self, name, depends_on=()):
+        def register(func):
+            self.stages[name] = (func, tuple(depends_on))
+            return func
+        return register
+
+    def set_input(self, name, value, key=None):
+        self.results[name] = value
+        self.fingerprints[name] = key if key is not None else fingerprint(value)
+
+    def run(self, name, untracked=None, **params):
+        # `untracked` kwargs (e.g. progress callbacks) are passed through but not fingerprinted
+        func, depends_on = self.stages[name]
+        for dependency in depends_on:
+            if dependency not in self.results:
+                self.run(dependency)
+
+        key = fingerprint([name, [self.fingerprints[dep] for dep in depends_on], params])
+        cached = self.memo.get(name)
+        inputs = [self.results[dep] for dep in depends_on]
+        if cached is not None and cached[0] == key:
+            result = cached[1]
+            record_event(name, "stage", 0.0, cached=True)
+        else:
+            with profile_stage(name, inputs[0] if inputs else None):
+                result = func(*inputs, **params, **(untracked or {}))
+            self.memo[name] = (key, result)
+            self.recomputed.append(name)
+
+        self.results[name] = result
+        self.fingerprints[name] = key
+        return result
+
+POINT_DETAIL_ROWS = 100
+
+def render_point_figure(fig, rows):
+    # Markers carry their row position as customdata; the full rows are only
+    # sent to the browser for the points the user selects
+    event = st.plotly_chart(fig, on_select="rerun", selection_mode=("points", "box", "lasso"),
+                            key=f"points-{fig.layout.title.text}")
+    positions = [point["customdata"] for point in event.selection.points if "customdata" in point]
+    if positions:
+        positions = list(dict.fromkeys(int(np.ravel(position)[0]) for position in positions))
+        st.caption(f"{len(positions):,} selected point(s)")
+        st.dataframe(rows.iloc[positions[:POINT_DETAIL_ROWS]])
+
+def render_outputs(outputs):
+    # Replays the Streamlit elements recorded by a compute_* stage
+    for kind, value in outputs:
+        if kind == 'figure':
+            st.plotly_chart(value)
+        elif kind == 'pyplot':
+            st.pyplot(value)
+        elif kind == 'points':
+            render_point_figure(*value)
+        elif kind == 'timeseries':
+            render_timeseries(*value)
+        else:
+            getattr(st, kind)(value)
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+import pandas as pd
+import streamlit as st
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PROFILE_MAX_EVENTS = int(os.environ.get("EDA_PROFILE_MAX_EVENTS", 5000))
+# How often a running stage polls the resident size for its peak
+RSS_SAMPLE_SECONDS = float(os.environ.get("EDA_PROFILE_RSS_SAMPLE_SECONDS", 0.005))
+
+# Process-wide like the Groq latency log; each event is tagged with the run it belongs to
+_events = deque(maxlen=PROFILE_MAX_EVENTS)
+_lock = threading.Lock()
+_run_ids = itertools.count(1)
+# Each Streamlit session reruns its script in its own thread, so the active run is
+# per context; work handed to other threads must pass its run explicitly
+_current_run = contextvars.ContextVar("profile_run", default=0)
+# perf_counter is only meaningful relative to itself; anchor it to the epoch for traces
+_clock_offset = time.time() - time.perf_counter()
+
+def rss_bytes():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+@contextmanager
+def peak_rss():
+    # ru_maxrss only ever grows, so a stage that stays below an earlier peak would
+    # read as free; poll the resident size instead
+    peak = {"start": rss_bytes(), "peak": rss_bytes()}
+    if peak["start"] is None:
+        yield peak
+        return
+    done = threading.Event()
+    def sample():
+        while not done.wait(RSS_SAMPLE_SECONDS):
+            peak["peak"] = max(peak["peak"], rss_bytes())
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield peak
+    finally:
+        done.set()
+        sampler.join()
+        peak["peak"] = max(peak["peak"], rss_bytes())
+
+def _shape(value):
+    shape = getattr(value, "shape", None)
+    if shape is None:
+        return None, None
+    return shape[0], (shape[1] if len(shape) > 1 else 1)
+
+def start_run():
+    run = next(_run_ids)
+    _current_run.set(run)
+    return run
+
+def current_run():
+    return _current_run.get()
+
+def record_event(name, category, wall_seconds, started=None, cpu_seconds=None, run=None, **args):
+    # For work measured elsewhere (e.g. async Groq calls); started defaults to now - wall
+    started = started if started is not None else time.perf_counter() - wall_seconds
+    event = {
+        "run": run if run is not None else _current_run.get(),
+        "name": name,
+        "category": category,
+        "start": started + _clock_offset,
+        "wall_s": wall_seconds,
+        "cpu_s": cpu_seconds,
+        "thread": threading.get_ident(),
+    }
+    event.update(args)
+    with _lock:
+        _events.append(event)
+    return event
+
+@contextmanager
+def profile_stage(name, data=None, category="stage"):
+    # Yields a dict the caller may extend, e.g. with the output shape
+    extra = {}
+    rows, columns = _shape(data)
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    try:
+        with peak_rss() as peak:
+            yield extra
+    finally:
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+        rss_before, rss_after = peak["start"], rss_bytes()
+        if "output" in extra:
+            extra["output_rows"], extra["output_columns"] = _shape(extra.pop("output"))
+        record_event(
+            name, category, wall, started=started, cpu_seconds=cpu,
+            rows=rows, columns=columns,
+            rss_delta_bytes=rss_after - rss_before if rss_before is not None else None,
+            peak_rss_delta_bytes=peak["peak"] - rss_before if rss_before is not None else None,
+            **extra,
+        )
+
+def profile_events(run=None):
+    with _lock:
+        events = list(_events)
+    if run is not None:
+        events = [event for event in events if event["run"] == run]
+    return events
+
+def events_to_jsonl(events):
+    return "".join(json.dumps(event, default=str) + "\n" for event in events)
+
+def events_to_chrome_trace(events):
+    # Complete ("X") events; load in chrome://tracing or https://ui.perfetto.dev
+    pid = os.getpid()
+    trace = []
+    for event in events:
+        args = {key: value for key, value in event.items() if key not in ("name", "category", "start", "wall_s", "thread")}
+        trace.append({
+            "name": event["name"],
+            "cat": event["category"],
+            "ph": "X",
+            "ts": event["start"] * 1e6,
+            "dur": event["wall_s"] * 1e6,
+            "pid": pid,
+            "tid": event["thread"],
+            "args": args,
+        })
+    return json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"}, default=str)
+
+def render_profile_panel(run):
+    events = profile_events(run)
+    if not events:
+        return
+    with st.expander("Performance profile"):
+        table = pd.DataFrame(events).drop(columns=["run", "start", "thread"])
+        st.write(table)
+        st.download_button("Download JSON lines", events_to_jsonl(events), file_name="profile.jsonl",
+                           mime="application/x-ndjson", on_click='ignore')
+        st.download_button("Download Chrome trace", events_to_chrome_trace(events), file_name="profile_trace.json",
+                           mime="application/json", on_click='ignore')
\ No newline at end of file
@@ -0,0 +1,182 @@
+import math
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, is_bool_dtype
+
+# Frames with more rows than this use sketches instead of exact nunique/quantiles
+SKETCH_ROW_THRESHOLD = 5_000_000
+SKETCH_CHUNK_ROWS = 1_000_000
+DEFAULT_DISTINCT_ERROR = 0.01
+DEFAULT_RANK_ERROR = 0.005
+
+def _hash_values(series):
+    series = series.dropna()
+    # Hash numbers as float64 so chunks downcast to different widths still agree
+    if is_numeric_dtype(series) and not is_bool_dtype(series):
+        series = series.astype('float64')
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+def _leading_zeros(values):
+    # Split into 32-bit halves so float64 log2 stays exact
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    zeros = np.where(high > 0,
+                     31 - np.floor(np.log2(np.maximum(high, 1))),
+                     63 - np.floor(np.log2(np.maximum(low, 1))))
+    return zeros.astype(np.uint8)
+
+class HyperLogLog:
+    def __init__(self, relative_error=DEFAULT_DISTINCT_ERROR):
+        # Standard error is about 1.04 / sqrt(m) for m registers
+        self.p = min(max(math.ceil(math.log2((1.04 / relative_error) ** 2)), 4), 18)
+        self.m = 1 << self.p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, series):
+        hashes = _hash_values(series)
+        if len(hashes) == 0:
+            return self
+        p = np.uint64(self.p)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        remaining = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = _leading_zeros(remaining) + 1
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * self.m and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = self.m * math.log(self.m / empty)
+        return int(round(estimate))
+
+class KLLSketch:
+    def __init__(self, rank_error=DEFAULT_RANK_ERROR, seed=None):
+        # Empirical KLL bound: rank error ~ 2.296 / k^0.9723
+        self.k = max(8, math.ceil((2.296 / rank_error) ** (1 / 0.9723)))
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        while True:
+            level = next((h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)), None)
+            if level is None:
+                return
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item stays behind; the rest are halved and promoted with double weight
+            keep = len(items) % 2
+            promoted = items[keep:][self._rng.integers(2)::2]
+            self.levels[level] = items[:keep]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, series):
+        values = pd.to_numeric(pd.Series(series), errors='coerce').dropna().to_numpy(dtype=np.float64)
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = np.nanmin([self.min, values.min()])
+        self.max = np.nanmax([self.max, values.max()])
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = np.nanmin([self.min, other.min])
+        self.max = np.nanmax([self.max, other.max])
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level, dtype=np.float64)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = items[np.minimum(positions, len(items) - 1)]
+        result[qs <= 0] = self.min
+        result[qs >= 1] = self.max
+        return result
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+def _iter_chunks(data, chunk_rows):
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_rows):
+            yield data.iloc[start:start + chunk_rows]
+    else:
+        yield from data
+
+def sketch_frame(data, relative_error=DEFAULT_DISTINCT_ERROR, rank_error=DEFAULT_RANK_ERROR, chunk_rows=SKETCH_CHUNK_ROWS):
+    # One pass over a frame (or an iterable of chunks) building per-column sketches
+    sketches = {}
+    for chunk in _iter_chunks(data, chunk_rows):
+        for col in chunk.columns:
+            if col not in sketches:
+                sketches[col] = {
+                    'rows': 0,
+                    'null_count': 0,
+                    'distinct': HyperLogLog(relative_error),
+                    'quantiles': KLLSketch(rank_error, seed=0) if is_numeric_dtype(chunk[col]) and not is_bool_dtype(chunk[col]) else None,
+                }
+            sketch = sketches[col]
+            series = chunk[col]
+            sketch['rows'] += len(series)
+            sketch['null_count'] += int(series.isna().sum())
+            sketch['distinct'].update(series)
+            if sketch['quantiles'] is not None:
+                sketch['quantiles'].update(series)
+    return sketches
+
+def merge_sketches(left, right):
+    for col, sketch in right.items():
+        if col not in left:
+            left[col] = sketch
+            continue
+        left[col]['rows'] += sketch['rows']
+        left[col]['null_count'] += sketch['null_count']
+        left[col]['distinct'].merge(sketch['distinct'])
+        if left[col]['quantiles'] is not None and sketch['quantiles'] is not None:
+            left[col]['quantiles'].merge(sketch['quantiles'])
+    return left
+
+def sketch_summary(sketches):
+    rows = {}
+    for col, sketch in sketches.items():
+        summary = {
+            'count': sketch['rows'] - sketch['null_count'],
+            'nulls': sketch['null_count'],
+            'unique (approx.)': sketch['distinct'].count(),
+        }
+        if sketch['quantiles'] is not None:
+            q = sketch['quantiles'].quantiles([0, 0.25, 0.5, 0.75, 1])
+            summary.update({'min': q[0], '25% (approx.)': q[1], '50% (approx.)': q[2], '75% (approx.)': q[3], 'max': q[4]})
+        rows[col] = summary
+    return pd.DataFrame(rows)
\ No newline at end of file
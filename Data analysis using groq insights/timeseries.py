@@ -0,0 +1,139 @@
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+from lazy_imports import lazy_import
+
+TIMESERIES_PIXEL_BUDGET = int(os.environ.get("EDA_TIMESERIES_PIXEL_BUDGET", 2000))
+# 'lttb' keeps the visual shape of the line, 'minmax' keeps every spike
+TIMESERIES_DOWNSAMPLE = os.environ.get("EDA_TIMESERIES_DOWNSAMPLE", "lttb")
+# A level is only read if the window holds at most this many buckets per pixel
+LEVEL_OVERSAMPLING = 4
+RESOLUTIONS = [
+    ("minute", "datetime64[m]"),
+    ("hour", "datetime64[h]"),
+    ("day", "datetime64[D]"),
+    ("month", "datetime64[M]"),
+]
+
+go = lazy_import("plotly.graph_objects")
+
+def _aggregate(times, starts, count, total, low, high):
+    # Combine consecutive rows that share a bucket; inputs are already time sorted
+    return {
+        "time": times[starts],
+        "count": np.add.reduceat(count, starts),
+        "sum": np.add.reduceat(total, starts),
+        "min": np.minimum.reduceat(low, starts),
+        "max": np.maximum.reduceat(high, starts),
+    }
+
+def build_pyramid(time_series, value_series):
+    # Sorted raw points plus minute/hour/day/month aggregates, each level built
+    # from the one below so the full data is only scanned once
+    times = pd.to_datetime(time_series, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    values = pd.to_numeric(value_series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    keep = ~np.isnat(times) & np.isfinite(values)
+    times, values = times[keep], values[keep]
+    if len(times) > 1 and not (times[1:] >= times[:-1]).all():
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+
+    levels = []
+    level = {"time": times, "count": np.ones(len(values), dtype=np.int64), "sum": values, "min": values, "max": values}
+    for name, unit in RESOLUTIONS:
+        if len(level["time"]) == 0:
+            break
+        buckets = level["time"].astype(unit)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        if len(starts) == len(level["time"]):
+            continue
+        level = _aggregate(buckets.astype('datetime64[ns]'), starts, level["count"], level["sum"], level["min"], level["max"])
+        level["name"] = name
+        levels.append(level)
+    return {"time": times, "value": values, "levels": levels}
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets; x must be numeric and increasing
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+def minmax(y, n_out):
+    # Index of the minimum and maximum of each of n_out / 2 equal buckets
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, max(n_out // 2, 1) + 1).astype(np.int64)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            chunk = y[start:end]
+            selected += [start + int(np.argmin(chunk)), start + int(np.argmax(chunk))]
+    return np.unique(selected)
+
+def series_view(pyramid, start=None, end=None, pixel_budget=TIMESERIES_PIXEL_BUDGET, method=TIMESERIES_DOWNSAMPLE):
+    # Picks the finest source (raw or an aggregate level) that is cheap enough for
+    # the window, then downsamples it to the pixel budget
+    start = np.datetime64(start, 'ns') if start is not None else None
+    end = np.datetime64(end, 'ns') if end is not None else None
+    sources = [{"name": "raw", "time": pyramid["time"], "mean": pyramid["value"]}]
+    sources += [dict(level, mean=level["sum"] / level["count"]) for level in pyramid["levels"]]
+
+    for source in sources:
+        lo = np.searchsorted(source["time"], start, side='left') if start is not None else 0
+        hi = np.searchsorted(source["time"], end, side='right') if end is not None else len(source["time"])
+        if hi - lo <= pixel_budget * LEVEL_OVERSAMPLING:
+            break
+
+    view = {key: source[key][lo:hi] for key in ("time", "mean", "min", "max") if key in source}
+    if method == 'minmax':
+        picked = minmax(view["mean"], pixel_budget)
+    else:
+        picked = lttb(view["time"].astype(np.int64).astype(np.float64), view["mean"], pixel_budget)
+    view = {key: value[picked] for key, value in view.items()}
+    view["resolution"] = source["name"]
+    view["source_points"] = hi - lo
+    return view
+
+def timeseries_figure(view, column, title):
+    fig = go.Figure()
+    if "min" in view:
+        # Aggregated levels also show the min/max envelope of each bucket
+        fig.add_trace(go.Scattergl(x=view["time"], y=view["max"], mode='lines', line=dict(width=0),
+                                   showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scattergl(x=view["time"], y=view["min"], mode='lines', line=dict(width=0),
+                                   fill='tonexty', name="min-max", hoverinfo='skip'))
+    fig.add_trace(go.Scattergl(x=view["time"], y=view["mean"], mode='lines', name=column))
+    fig.update_layout(title=title, xaxis_title="time", yaxis_title=column, hovermode='x unified')
+    return fig
+
+def render_timeseries(pyramid, column, title):
+    # Zooming goes back to the server so each window is served from the right level
+    if len(pyramid["time"]) == 0:
+        st.warning(f"No valid points to plot for {column}.")
+        return
+    first = pd.Timestamp(pyramid["time"][0]).to_pydatetime()
+    last = pd.Timestamp(pyramid["time"][-1]).to_pydatetime()
+    start, end = first, last
+    if last > first:
+        start, end = st.slider("Time window", min_value=first, max_value=last, value=(first, last),
+                               key=f"timeseries-{title}")
+    view = series_view(pyramid, start, end)
+    st.plotly_chart(timeseries_figure(view, column, title))
+    st.caption(f"{len(view['time']):,} of {view['source_points']:,} points at {view['resolution']} resolution "
+               f"({len(pyramid['time']):,} rows in total).")
\ No newline at end of file
@@ -1,20 +1,129 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, LabelEncoder, OrdinalEncoder
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, accuracy_score
 import io
-import base64
-import sweetviz as sv
+import os
+import gzip
+import time
+import tempfile
 from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype, is_categorical_dtype, is_object_dtype
 
+from app_common import EXCEL_ENGINE, select_excel_sheet
+from lazy_imports import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+impute = lazy_import("sklearn.impute")
+preprocessing = lazy_import("sklearn.preprocessing")
+ensemble = lazy_import("sklearn.ensemble")
+model_selection = lazy_import("sklearn.model_selection")
+metrics = lazy_import("sklearn.metrics")
+
+EXPORT_CHUNK_ROWS = 100_000
+
+def export_csv(df, compress=False):
+    # Written to a temp file chunk by chunk instead of building the whole CSV string in memory
+    handle, path = tempfile.mkstemp(prefix="eda_export_", suffix=".csv.gz" if compress else ".csv")
+    os.close(handle)
+    started = time.perf_counter()
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as out:
+        for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+            df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(out, index=False, header=start == 0)
+    return path, time.perf_counter() - started
+
+def _read_export(path):
+    with open(path, 'rb') as handle:
+        return handle.read()
+
+def _replace_export(path):
+    # Only the latest export of a session is kept on disk
+    previous = st.session_state.get("csv_export")
+    if previous is not None and previous != path and os.path.exists(previous):
+        os.remove(previous)
+    st.session_state["csv_export"] = path
+
+def download_csv(df, export_format):
+    # Shared by both analysis sections below
+    try:
+        path, seconds = export_csv(df, compress=export_format == ".csv.gz")
+        size = os.path.getsize(path)
+        st.caption(f"{len(df):,} rows, {size / 1024 ** 2:,.1f} MB in {seconds:.2f}s "
+                   f"({len(df) / max(seconds, 1e-9):,.0f} rows/s)")
+        _replace_export(path)
+        # A callable is only read when the button is clicked, not on every rerun
+        st.download_button("Download CSV", lambda: _read_export(path), file_name=f"data{export_format}",
+                           mime="application/gzip" if export_format == ".csv.gz" else "text/csv",
+                           on_click='ignore')
+    except Exception as e:
+        st.error(f"An error occurred while exporting to CSV: {str(e)}")
+
+def download_markdown(df, original_df, corr_matrix=None, feature_importance=None):
+    markdown_report = f"""
+    # Data Analysis Report
+
+    ## Dataset Overview
+    - Number of rows: {original_df.shape[0]}
+    - Number of columns: {original_df.shape[1]}
+
+    ## Summary Statistics
+    {df.describe(include='all').to_markdown()}
+
+    ## Correlation Matrix
+    {corr_matrix.to_markdown() if corr_matrix is not None else "No correlation matrix available."}
+
+    ## Feature Importance
+    {feature_importance.to_markdown() if feature_importance is not None else "Feature importance not calculated."}
+    """
+    st.download_button("Download Markdown report", markdown_report, file_name="report.md",
+                       mime="text/markdown", on_click='ignore')
+
+def download_image(df, export_format, corr_matrix=None, feature_importance=None):
+    fig, axs = plt.subplots(2, 2, figsize=(20, 20))
+    df.select_dtypes(include=[np.number]).hist(ax=axs[0, 0])
+    axs[0, 0].set_title("Histograms")
+    if corr_matrix is not None:
+        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=axs[0, 1])
+        axs[0, 1].set_title("Correlation Matrix")
+    if feature_importance is not None:
+        feature_importance.plot(kind='bar', x='feature', y='importance', ax=axs[1, 0])
+        axs[1, 0].set_title("Feature Importance")
+    df.select_dtypes(include=[np.number]).boxplot(ax=axs[1, 1])
+    axs[1, 1].set_title("Box Plots")
+    plt.tight_layout()
+
+    img = io.BytesIO()
+    fig.savefig(img, format=export_format[1:])
+    plt.close(fig)
+    st.download_button(f"Download {export_format.upper()} Image", img.getvalue(),
+                       file_name=f"summary_plot{export_format}",
+                       mime="image/svg+xml" if export_format == ".svg" else "image/png",
+                       on_click='ignore')
+
+def download_text(df, col_info, feature_importance=None):
+    text_report = f"""
+    Dataset Summary:
+    Number of rows: {df.shape[0]}
+    Number of columns: {df.shape[1]}
+    
+    Column Information:
+    {col_info.to_string()}
+    
+    Summary Statistics:
+    {df.describe(include='all').to_string()}
+    
+    Feature Importance:
+    {feature_importance.to_string() if feature_importance is not None else "Feature importance not calculated."}
+    """
+    st.download_button("Download TXT report", text_report, file_name="report.txt",
+                       mime="text/plain", on_click='ignore')
+
+# Parsed once per file and sheet; both analysis sections below reuse the result
+@st.cache_data
+def read_excel_sheet(content, sheet_name):
+    return pd.read_excel(io.BytesIO(content), sheet_name=sheet_name, engine=EXCEL_ENGINE)
+
 # Set page configuration
 st.set_page_config(page_title="Comprehensive EDA App", layout="wide")
 
@@ -80,7 +189,7 @@ def preprocess_column(series):
         return series
 
 def encode_categorical(df):
-    encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+    encoder = preprocessing.OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
     for col in df.select_dtypes(include=['category', 'object']):
         df[col] = encoder.fit_transform(df[[col]]).astype(int)
     return df
@@ -92,13 +201,17 @@ st.header("1. File Upload and Data Quality Assessment")
 
 uploaded_file = st.file_uploader("Choose a CSV or XLSX file", type=["csv", "xlsx"])
 
+excel_sheet = None
+if uploaded_file is not None and not uploaded_file.name.endswith('.csv'):
+    excel_sheet = select_excel_sheet(uploaded_file)
+
 if uploaded_file is not None:
     try:
         # Read the file
         if uploaded_file.name.endswith('.csv'):
             df = pd.read_csv(uploaded_file, low_memory=False)
         else:
-            df = pd.read_excel(uploaded_file)
+            df = read_excel_sheet(uploaded_file.getvalue(), excel_sheet)
         
         if df.empty:
             st.error("The uploaded file is empty. Please upload a file with data.")
@@ -153,17 +266,17 @@ if uploaded_file is not None:
             elif missing_strategy == "Fill missing data with mean/mode":
                 for column in df.columns:
                     if is_numeric_dtype(df[column]):
-                        imputer = SimpleImputer(strategy='mean')
+                        imputer = impute.SimpleImputer(strategy='mean')
                     else:
-                        imputer = SimpleImputer(strategy='most_frequent')
+                        imputer = impute.SimpleImputer(strategy='most_frequent')
                     df[column] = imputer.fit_transform(df[[column]])
                 st.success("Missing data filled with mean/mode.")
             else:
                 for column in df.columns:
                     if is_numeric_dtype(df[column]):
-                        imputer = SimpleImputer(strategy='median')
+                        imputer = impute.SimpleImputer(strategy='median')
                     else:
-                        imputer = SimpleImputer(strategy='most_frequent')
+                        imputer = impute.SimpleImputer(strategy='most_frequent')
                     df[column] = imputer.fit_transform(df[[column]])
                 st.success("Missing data filled with median/mode.")
             
@@ -279,9 +392,9 @@ if uploaded_file is not None:
                 y = df_encoded[target_column]
                 
                 if is_object_dtype(y) or is_categorical_dtype(y):
-                    model = RandomForestClassifier(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestClassifier(n_estimators=100, random_state=42)
                 else:
-                    model = RandomForestRegressor(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestRegressor(n_estimators=100, random_state=42)
                 
                 model.fit(X, y)
                 feature_importance = pd.DataFrame({'feature': X.columns, 'importance': model.feature_importances_})
@@ -295,19 +408,19 @@ if uploaded_file is not None:
             # Simple prediction
             st.subheader("Simple Prediction")
             try:
-                X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+                X_train, X_test, y_train, y_test = model_selection.train_test_split(X, y, test_size=0.2, random_state=42)
                 
                 if is_object_dtype(y) or is_categorical_dtype(y):
-                    model = RandomForestClassifier(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestClassifier(n_estimators=100, random_state=42)
                     model.fit(X_train, y_train)
                     y_pred = model.predict(X_test)
-                    accuracy = accuracy_score(y_test, y_pred)
+                    accuracy = metrics.accuracy_score(y_test, y_pred)
                     st.write(f"Model Accuracy: {accuracy:.2f}")
                 else:
-                    model = RandomForestRegressor(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestRegressor(n_estimators=100, random_state=42)
                     model.fit(X_train, y_train)
                     y_pred = model.predict(X_test)
-                    mse = mean_squared_error(y_test, y_pred)
+                    mse = metrics.mean_squared_error(y_test, y_pred)
                     st.write(f"Model Mean Squared Error: {mse:.2f}")
             except Exception as e:
                 st.error(f"An error occurred during model training and prediction: {str(e)}")
@@ -316,75 +429,17 @@ if uploaded_file is not None:
             st.header("6. Export Options")
             
             # Export options
-            export_format = st.selectbox("Choose export format:", (".md", ".csv", ".png", ".svg", ".txt"))
+            export_format = st.selectbox("Choose export format:", (".md", ".csv", ".csv.gz", ".png", ".svg", ".txt"))
             
             if st.button("Generate and Download Report"):
                 if export_format == ".md":
-                    markdown_report = f"""
-                    # Data Analysis Report
-
-                    ## Dataset Overview
-                    - Number of rows: {original_df.shape[0]}
-                    - Number of columns: {original_df.shape[1]}
-
-                    ## Summary Statistics
-                    {df.describe(include='all').to_markdown()}
-
-                    ## Correlation Matrix
-                    {corr_matrix.to_markdown() if 'corr_matrix' in locals() else "No correlation matrix available."}
-
-                    ## Feature Importance
-                    {feature_importance.to_markdown() if 'feature_importance' in locals() else "Feature importance not calculated."}
-                    """
-                    b64 = base64.b64encode(markdown_report.encode()).decode()
-                    href = f'<a href="data:text/markdown;base64,{b64}" download="report.md">Download Markdown report</a>'
-                    st.markdown(href, unsafe_allow_html=True)
-                elif export_format == ".csv":
-                    try:
-                        csv = original_df.to_csv(index=False)
-                        b64 = base64.b64encode(csv.encode()).decode()
-                        href = f'<a href="data:file/csv;base64,{b64}" download="data.csv">Download CSV</a>'
-                        st.markdown(href, unsafe_allow_html=True)
-                    except Exception as e:
-                        st.error(f"An error occurred while exporting to CSV: {str(e)}")
+                    download_markdown(df, original_df, locals().get('corr_matrix'), locals().get('feature_importance'))
+                elif export_format in (".csv", ".csv.gz"):
+                    download_csv(original_df, export_format)
                 elif export_format in (".png", ".svg"):
-                    fig, axs = plt.subplots(2, 2, figsize=(20, 20))
-                    df.select_dtypes(include=[np.number]).hist(ax=axs[0, 0])
-                    axs[0, 0].set_title("Histograms")
-                    if 'corr_matrix' in locals():
-                        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=axs[0, 1])
-                        axs[0, 1].set_title("Correlation Matrix")
-                    if 'feature_importance' in locals():
-                        feature_importance.plot(kind='bar', x='feature', y='importance', ax=axs[1, 0])
-                        axs[1, 0].set_title("Feature Importance")
-                    df.select_dtypes(include=[np.number]).boxplot(ax=axs[1, 1])
-                    axs[1, 1].set_title("Box Plots")
-                    plt.tight_layout()
-                    
-                    img = io.BytesIO()
-                    plt.savefig(img, format=export_format[1:])
-                    img.seek(0)
-                    b64 = base64.b64encode(img.getvalue()).decode()
-                    href = f'<a href="data:image/{export_format[1:]};base64,{b64}" download="summary_plot{export_format}">Download {export_format.upper()} Image</a>'
-                    st.markdown(href, unsafe_allow_html=True)
+                    download_image(df, export_format, locals().get('corr_matrix'), locals().get('feature_importance'))
                 else:  # .txt
-                    text_report = f"""
-                    Dataset Summary:
-                    Number of rows: {df.shape[0]}
-                    Number of columns: {df.shape[1]}
-                    
-                    Column Information:
-                    {col_info.to_string()}
-                    
-                    Summary Statistics:
-                    {df.describe(include='all').to_string()}
-                    
-                    Feature Importance:
-                    {feature_importance.to_string() if 'feature_importance' in locals() else "Feature importance not calculated."}
-                    """
-                    b64 = base64.b64encode(text_report.encode()).decode()
-                    href = f'<a href="data:file/txt;base64,{b64}" download="report.txt">Download TXT report</a>'
-                    st.markdown(href, unsafe_allow_html=True)
+                    download_text(df, col_info, locals().get('feature_importance'))
                 
                 st.success("Report generated and ready for download!")
 
@@ -399,7 +454,7 @@ if uploaded_file is not None:
         if uploaded_file.name.endswith('.csv'):
             df = pd.read_csv(uploaded_file, low_memory=False)
         else:
-            df = pd.read_excel(uploaded_file)
+            df = read_excel_sheet(uploaded_file.getvalue(), excel_sheet)
         
         if df.empty:
             st.error("The uploaded file is empty. Please upload a file with data.")
@@ -454,17 +509,17 @@ if uploaded_file is not None:
             elif missing_strategy == "Fill missing data with mean/mode":
                 for column in df.columns:
                     if is_numeric_dtype(df[column]):
-                        imputer = SimpleImputer(strategy='mean')
+                        imputer = impute.SimpleImputer(strategy='mean')
                     else:
-                        imputer = SimpleImputer(strategy='most_frequent')
+                        imputer = impute.SimpleImputer(strategy='most_frequent')
                     df[column] = imputer.fit_transform(df[[column]])
                 st.success("Missing data filled with mean/mode.")
             else:
                 for column in df.columns:
                     if is_numeric_dtype(df[column]):
-                        imputer = SimpleImputer(strategy='median')
+                        imputer = impute.SimpleImputer(strategy='median')
                     else:
-                        imputer = SimpleImputer(strategy='most_frequent')
+                        imputer = impute.SimpleImputer(strategy='most_frequent')
                     df[column] = imputer.fit_transform(df[[column]])
                 st.success("Missing data filled with median/mode.")
             
@@ -580,9 +635,9 @@ if uploaded_file is not None:
                 y = df_encoded[target_column]
                 
                 if is_object_dtype(y) or is_categorical_dtype(y):
-                    model = RandomForestClassifier(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestClassifier(n_estimators=100, random_state=42)
                 else:
-                    model = RandomForestRegressor(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestRegressor(n_estimators=100, random_state=42)
                 
                 model.fit(X, y)
                 feature_importance = pd.DataFrame({'feature': X.columns, 'importance': model.feature_importances_})
@@ -596,19 +651,19 @@ if uploaded_file is not None:
             # Simple prediction
             st.subheader("Simple Prediction")
             try:
-                X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+                X_train, X_test, y_train, y_test = model_selection.train_test_split(X, y, test_size=0.2, random_state=42)
                 
                 if is_object_dtype(y) or is_categorical_dtype(y):
-                    model = RandomForestClassifier(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestClassifier(n_estimators=100, random_state=42)
                     model.fit(X_train, y_train)
                     y_pred = model.predict(X_test)
-                    accuracy = accuracy_score(y_test, y_pred)
+                    accuracy = metrics.accuracy_score(y_test, y_pred)
                     st.write(f"Model Accuracy: {accuracy:.2f}")
                 else:
-                    model = RandomForestRegressor(n_estimators=100, random_state=42)
+                    model = ensemble.RandomForestRegressor(n_estimators=100, random_state=42)
                     model.fit(X_train, y_train)
                     y_pred = model.predict(X_test)
-                    mse = mean_squared_error(y_test, y_pred)
+                    mse = metrics.mean_squared_error(y_test, y_pred)
                     st.write(f"Model Mean Squared Error: {mse:.2f}")
             except Exception as e:
                 st.error(f"An error occurred during model training and prediction: {str(e)}")
@@ -617,75 +672,17 @@ if uploaded_file is not None:
             st.header("6. Export Options")
             
             # Export options
-            export_format = st.selectbox("Choose export format:", (".md", ".csv", ".png", ".svg", ".txt"))
+            export_format = st.selectbox("Choose export format:", (".md", ".csv", ".csv.gz", ".png", ".svg", ".txt"))
             
             if st.button("Generate and Download Report"):
                 if export_format == ".md":
-                    markdown_report = f"""
-                    # Data Analysis Report
-
-                    ## Dataset Overview
-                    - Number of rows: {original_df.shape[0]}
-                    - Number of columns: {original_df.shape[1]}
-
-                    ## Summary Statistics
-                    {df.describe(include='all').to_markdown()}
-
-                    ## Correlation Matrix
-                    {corr_matrix.to_markdown() if 'corr_matrix' in locals() else "No correlation matrix available."}
-
-                    ## Feature Importance
-                    {feature_importance.to_markdown() if 'feature_importance' in locals() else "Feature importance not calculated."}
-                    """
-                    b64 = base64.b64encode(markdown_report.encode()).decode()
-                    href = f'<a href="data:text/markdown;base64,{b64}" download="report.md">Download Markdown report</a>'
-                    st.markdown(href, unsafe_allow_html=True)
-                elif export_format == ".csv":
-                    try:
-                        csv = original_df.to_csv(index=False)
-                        b64 = base64.b64encode(csv.encode()).decode()
-                        href = f'<a href="data:file/csv;base64,{b64}" download="data.csv">Download CSV</a>'
-                        st.markdown(href, unsafe_allow_html=True)
-                    except Exception as e:
-                        st.error(f"An error occurred while exporting to CSV: {str(e)}")
+                    download_markdown(df, original_df, locals().get('corr_matrix'), locals().get('feature_importance'))
+                elif export_format in (".csv", ".csv.gz"):
+                    download_csv(original_df, export_format)
                 elif export_format in (".png", ".svg"):
-                    fig, axs = plt.subplots(2, 2, figsize=(20, 20))
-                    df.select_dtypes(include=[np.number]).hist(ax=axs[0, 0])
-                    axs[0, 0].set_title("Histograms")
-                    if 'corr_matrix' in locals():
-                        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', ax=axs[0, 1])
-                        axs[0, 1].set_title("Correlation Matrix")
-                    if 'feature_importance' in locals():
-                        feature_importance.plot(kind='bar', x='feature', y='importance', ax=axs[1, 0])
-                        axs[1, 0].set_title("Feature Importance")
-                    df.select_dtypes(include=[np.number]).boxplot(ax=axs[1, 1])
-                    axs[1, 1].set_title("Box Plots")
-                    plt.tight_layout()
-                    
-                    img = io.BytesIO()
-                    plt.savefig(img, format=export_format[1:])
-                    img.seek(0)
-                    b64 = base64.b64encode(img.getvalue()).decode()
-                    href = f'<a href="data:image/{export_format[1:]};base64,{b64}" download="summary_plot{export_format}">Download {export_format.upper()} Image</a>'
-                    st.markdown(href, unsafe_allow_html=True)
+                    download_image(df, export_format, locals().get('corr_matrix'), locals().get('feature_importance'))
                 else:  # .txt
-                    text_report = f"""
-                    Dataset Summary:
-                    Number of rows: {df.shape[0]}
-                    Number of columns: {df.shape[1]}
-                    
-                    Column Information:
-                    {col_info.to_string()}
-                    
-                    Summary Statistics:
-                    {df.describe(include='all').to_string()}
-                    
-                    Feature Importance:
-                    {feature_importance.to_string() if 'feature_importance' in locals() else "Feature importance not calculated."}
-                    """
-                    b64 = base64.b64encode(text_report.encode()).decode()
-                    href = f'<a href="data:file/txt;base64,{b64}" download="report.txt">Download TXT report</a>'
-                    st.markdown(href, unsafe_allow_html=True)
+                    download_text(df, col_info, locals().get('feature_importance'))
                 
                 st.success("Report generated and ready for download!")
 
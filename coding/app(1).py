@@ -1,19 +1,19 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
-from scipy import stats
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 import io
-import base64
-import docx
-from docx.shared import Inches
-import xlsxwriter
+from app_common import EXCEL_ENGINE, select_excel_sheet
+from lazy_imports import lazy_import
+from timeseries import build_pyramid, render_timeseries
+from chart_data import histogram_summary, histogram_figure
+
+stats = lazy_import("scipy.stats")
+ensemble = lazy_import("sklearn.ensemble")
+model_selection = lazy_import("sklearn.model_selection")
+preprocessing = lazy_import("sklearn.preprocessing")
+docx = lazy_import("docx")
 
 st.set_page_config(page_title="Enhanced EDA Master", layout="wide", page_icon="📊")
 
@@ -53,12 +53,12 @@ st.markdown(
 )
 
 @st.cache_data
-def read_file(file):
+def read_file(file, sheet_name=0):
     try:
         if file.name.endswith('.csv'):
             return pd.read_csv(file)
         elif file.name.endswith(('.xls', '.xlsx')):
-            return pd.read_excel(file)
+            return pd.read_excel(file, sheet_name=sheet_name, engine=EXCEL_ENGINE)
         else:
             st.error("Unsupported file format. Please upload a CSV or Excel file.")
             return None
@@ -111,9 +111,11 @@ def generate_interactive_plots(df):
 
     # Histogram for numerical columns
     for col in num_cols:
-        fig = px.histogram(df, x=col, marginal="box", hover_data=df.columns)
-        fig.update_layout(title=f"Distribution of {col}")
-        st.plotly_chart(fig)
+        # Only bin counts and box statistics are sent to the browser
+        summary = histogram_summary(df[col])
+        if summary is None:
+            continue
+        st.plotly_chart(histogram_figure(summary, col, f"Distribution of {col}"))
         st.markdown(f"""
         **How to interpret:**
         - The bars show the frequency of values in different ranges.
@@ -210,7 +212,7 @@ def feature_importance(df):
     X = df[num_cols].drop(num_cols[0], axis=1)
     y = df[num_cols[0]]
 
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model = ensemble.RandomForestRegressor(n_estimators=100, random_state=42)
     model.fit(X, y)
 
     importance = pd.DataFrame({'feature': X.columns, 'importance': model.feature_importances_})
@@ -226,6 +228,11 @@ def feature_importance(df):
     - This analysis helps identify which variables have the strongest relationship with the target.
     """)
 
+# cache_resource hands back the same pyramid instead of unpickling a copy per rerun
+@st.cache_resource
+def time_series_pyramid(df_ts, date_col, value_col):
+    return build_pyramid(df_ts[date_col], df_ts[value_col])
+
 def time_series_analysis(df):
     st.subheader("Time Series Analysis")
 
@@ -237,11 +244,10 @@ def time_series_analysis(df):
     date_col = st.selectbox("Select date column for time series analysis:", date_cols)
     value_col = st.selectbox("Select value column for time series analysis:", df.select_dtypes(include=['int64', 'float64']).columns)
 
-    df_ts = df[[date_col, value_col]].set_index(date_col)
-    df_ts = df_ts.resample('D').mean()
-
-    fig = px.line(df_ts, x=df_ts.index, y=value_col, title=f"Time Series of {value_col}")
-    st.plotly_chart(fig)
+    # The slider window is served from the finest pre-aggregated level that fits
+    # the pixel budget, then downsampled
+    render_timeseries(time_series_pyramid(df[[date_col, value_col]], date_col, value_col), value_col,
+                      f"Time Series of {value_col}")
 
     st.markdown("""
     **How to interpret:**
@@ -264,13 +270,13 @@ def simple_ml_prediction(df):
     X = df[features]
     y = df[target]
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = model_selection.train_test_split(X, y, test_size=0.2, random_state=42)
 
-    scaler = StandardScaler()
+    scaler = preprocessing.StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
 
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model = ensemble.RandomForestRegressor(n_estimators=100, random_state=42)
     model.fit(X_train_scaled, y_train)
 
     train_score = model.score(X_train_scaled, y_train)
@@ -314,7 +320,7 @@ def main():
     uploaded_file = st.file_uploader("Choose a CSV or Excel file", type=["csv", "xlsx", "xls"])
 
     if uploaded_file is not None:
-        df = read_file(uploaded_file)
+        df = read_file(uploaded_file, select_excel_sheet(uploaded_file) if uploaded_file.name.endswith(('.xls', '.xlsx')) else 0)
 
         if df is not None:
             st.subheader("Data Preview")
@@ -1,28 +1,33 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
-import plotly.graph_objects as go
-from docx import Document
-import openpyxl
-import textract
-import nltk
-from wordcloud import WordCloud
 import io
 import os
 from collections import Counter
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.impute import SimpleImputer
-import spacy
+from app_common import EXCEL_ENGINE, select_excel_sheet
+from lazy_imports import lazy_import
+from timeseries import build_pyramid, series_view
 
-# Download necessary NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
+spacy = lazy_import("spacy")
+nltk = lazy_import("nltk")
+docx = lazy_import("docx")
+textract = lazy_import("textract")
+impute = lazy_import("sklearn.impute")
+preprocessing = lazy_import("sklearn.preprocessing")
+go = lazy_import("plotly.graph_objects")
+plt = lazy_import("matplotlib.pyplot")
+wordcloud = lazy_import("wordcloud")
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+# The spaCy model and NLTK corpora load once per process instead of on every rerun
+@st.cache_resource
+def load_nlp():
+    return spacy.load("en_core_web_sm")
+
+@st.cache_resource
+def english_stopwords():
+    nltk.download('stopwords', quiet=True)
+    return set(nltk.corpus.stopwords.words('english'))
 
 # Function to read various file types
 def read_file(file):
@@ -31,11 +36,11 @@ def read_file(file):
     if file_extension == '.txt':
         return file.getvalue().decode('utf-8')
     elif file_extension == '.docx':
-        doc = Document(io.BytesIO(file.getvalue()))
+        doc = docx.Document(io.BytesIO(file.getvalue()))
         return '\n'.join([para.text for para in doc.paragraphs])
     elif file_extension in ['.xlsx', '.xls']:
-        df = pd.read_excel(file, engine='openpyxl')
-        return df
+        # Only the chosen sheet is parsed
+        return pd.read_excel(file, sheet_name=select_excel_sheet(file), engine=EXCEL_ENGINE)
     elif file_extension == '.csv':
         df = pd.read_csv(file)
         return df
@@ -52,7 +57,7 @@ def clean_text(text):
     # Remove punctuation
     text = ''.join([char for char in text if char.isalnum() or char.isspace()])
     # Remove stopwords
-    stop_words = set(nltk.corpus.stopwords.words('english'))
+    stop_words = english_stopwords()
     words = text.split()
     words = [word for word in words if word not in stop_words]
     return ' '.join(words)
@@ -81,16 +86,16 @@ def preprocess_tabular_data(df):
     categorical_columns = df_processed.select_dtypes(exclude=[np.number]).columns
     
     # Handle missing values
-    imputer = SimpleImputer(strategy='mean')
+    imputer = impute.SimpleImputer(strategy='mean')
     df_processed[numeric_columns] = imputer.fit_transform(df_processed[numeric_columns])
     
     # Encode categorical variables
-    label_encoder = LabelEncoder()
+    label_encoder = preprocessing.LabelEncoder()
     for col in categorical_columns:
         df_processed[col] = label_encoder.fit_transform(df_processed[col].astype(str))
     
     # Scale numeric features
-    scaler = StandardScaler()
+    scaler = preprocessing.StandardScaler()
     df_processed[numeric_columns] = scaler.fit_transform(df_processed[numeric_columns])
     
     return df_processed, numeric_columns, categorical_columns
@@ -113,9 +118,9 @@ def tabular_eda(df):
 
 # Function to generate word cloud
 def generate_word_cloud(text):
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
+    cloud = wordcloud.WordCloud(width=800, height=400, background_color='white').generate(text)
     fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.imshow(cloud, interpolation='bilinear')
     ax.axis('off')
     return fig
 
@@ -135,6 +140,14 @@ def generate_interactive_line_chart(data, title, x_label, y_label):
     fig.update_layout(hovermode='x unified')
     return fig
 
+# Function to generate a time series chart from downsampled views, one line per column
+def generate_time_series_chart(views, title):
+    fig = go.Figure()
+    for column, view in views.items():
+        fig.add_trace(go.Scattergl(x=view["time"], y=view["mean"], mode='lines', name=column))
+    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Value", hovermode='x unified')
+    return fig
+
 # Function to generate interactive pie chart
 def generate_interactive_pie_chart(data, title):
     fig = px.pie(values=data.values, names=data.index, title=title,
@@ -149,21 +162,26 @@ def generate_interactive_heatmap(data, title):
 
 # Function to extract context from text
 def extract_context(text):
-    doc = nlp(text)
+    doc = load_nlp()(text)
     entities = [(ent.text, ent.label_) for ent in doc.ents]
     return entities
 
 # Function to generate context-based visualizations
 def generate_context_visualizations(df, context):
     visualizations = []
+    time_series = None
     
     for entity, label in context:
         if label == 'DATE':
             # Time series analysis
             if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-                time_series = df.set_index('date').resample('M').mean()
-                fig = generate_interactive_line_chart(time_series, f"Time Series Analysis - {entity}", "Date", "Value")
+                if time_series is None:
+                    # Pre-aggregated once per dataset instead of once per DATE entity, and
+                    # served at the finest level that fits the pixel budget
+                    dates = pd.to_datetime(df['date'], errors='coerce')
+                    time_series = {col: series_view(build_pyramid(dates, df[col]))
+                                   for col in df.select_dtypes(include='number').columns}
+                fig = generate_time_series_chart(time_series, f"Time Series Analysis - {entity}")
                 visualizations.append(("Time Series", fig))
         
         elif label == 'ORG':
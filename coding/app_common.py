@@ -0,0 +1,17 @@
+import streamlit as st
+import pandas as pd
+
+try:
+    import python_calamine
+    EXCEL_ENGINE = 'calamine'  # native reader, much faster than openpyxl
+except ImportError:
+    EXCEL_ENGINE = None
+
+def select_excel_sheet(file):
+    # Sheet names come from the workbook index; no sheet data is parsed here
+    with pd.ExcelFile(file, engine=EXCEL_ENGINE) as book:
+        sheet_names = book.sheet_names
+    file.seek(0)
+    if len(sheet_names) > 1:
+        return st.selectbox("Select sheet:", sheet_names)
+    return sheet_names[0]